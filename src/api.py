@@ -0,0 +1,237 @@
+# src/api.py
+import asyncio
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from langchain_core.messages import BaseMessage, ToolMessage
+from pydantic import BaseModel
+
+# --- Load Environment Variables FIRST ---
+load_dotenv()
+
+# --- Setup Database Path and Environment Variable SECOND ---
+# The prepare_* helpers raise on failure instead of reporting through Streamlit, so a
+# server that can't set up its data fails at startup rather than on the first request.
+from utils.db_setup import prepare_database
+db_path = prepare_database()
+os.environ["DB_PATH"] = db_path
+
+# --- Import the rest of the app modules THIRD ---
+from assistants.graph import get_graph
+from assistants.metrics import coalesced_call_stats, llm_call_stats, preroute_stats, prompt_cache_stats
+from utils.admission import admission_stats
+from utils.checkpoint_store import CompactingSaver, conversation_bytes
+from utils.vectorstore_setup import embedding_single_flight
+from tools.policy_tools import get_policy_retriever
+
+get_policy_retriever()
+
+DEFAULT_PASSENGER_ID = "3442 587242"
+DENIAL_MESSAGE = "The user denied this tool call. Please ask for clarification."
+AWAITING_APPROVAL = "The thread is waiting for tool approval; approve or deny first."
+NOTHING_PENDING = "No tool calls are waiting for approval."
+
+# One compiled graph serves every thread in this process; the checkpointer keeps each
+# thread's state apart, and a per-thread lock keeps turns on the same thread in order.
+# A thread belongs to the passenger it was created for; requests naming another
+# passenger are rejected, so one passenger can't act on another's conversation.
+graph = get_graph()
+app = FastAPI(title="Swiss Airlines Support API")
+_thread_passengers: dict[str, str] = {}
+_thread_locks: dict[str, list] = {}  # thread_id -> [lock, number of turns holding or waiting for it]
+
+
+class CreateThreadRequest(BaseModel):
+    passenger_id: str = DEFAULT_PASSENGER_ID
+
+
+class ChatRequest(BaseModel):
+    message: str
+    passenger_id: Optional[str] = None
+
+
+class ResumeRequest(BaseModel):
+    passenger_id: Optional[str] = None
+    reason: Optional[str] = None
+
+
+def _config(thread_id: str, passenger_id: Optional[str] = None) -> dict:
+    """The thread's graph config, checking `passenger_id` (if given) against the thread's owner."""
+    owner = _thread_passengers.get(thread_id)
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Unknown thread; create one with POST /threads.")
+    if passenger_id is not None and passenger_id != owner:
+        raise HTTPException(status_code=403, detail="The thread belongs to a different passenger.")
+    return {"configurable": {"passenger_id": owner, "thread_id": thread_id}}
+
+
+@asynccontextmanager
+async def _thread_lock(thread_id: str):
+    """Holds the thread's lock; the lock is dropped once no turn holds or waits for it."""
+    entry = _thread_locks.setdefault(thread_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _thread_locks[thread_id]
+
+
+def _serialize_message(message: BaseMessage) -> dict:
+    return {
+        "id": message.id,
+        "type": message.type,
+        "content": message.content,
+        "tool_calls": getattr(message, "tool_calls", []),
+    }
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _pending_tool_calls(config: dict) -> list[dict]:
+    """Returns the tool calls awaiting approval, or an empty list if the thread isn't interrupted."""
+    snapshot = await graph.aget_state(config)
+    if not snapshot.next:
+        return []
+    return snapshot.values["messages"][-1].tool_calls
+
+
+async def _stream_turn(config: dict, build_input: Callable[[list[dict]], object], resuming: bool) -> AsyncIterator[str]:
+    """Runs the graph for one turn and streams new messages, then the interrupt state, as SSE.
+
+    Whether the thread is waiting for approval is checked again under the thread's lock,
+    since another turn may have resumed or interrupted it after the request was accepted.
+    `build_input` receives the pending tool calls and returns the graph input.
+    """
+    thread_id = config["configurable"]["thread_id"]
+    async with _thread_lock(thread_id):
+        try:
+            if thread_id not in _thread_passengers:
+                yield _sse("error", {"status": 404, "detail": "The thread was deleted."})
+                return
+            pending = await _pending_tool_calls(config)
+            if resuming and not pending:
+                yield _sse("error", {"status": 409, "detail": NOTHING_PENDING})
+                return
+            if not resuming and pending:
+                yield _sse("error", {"status": 409, "detail": AWAITING_APPROVAL})
+                return
+            graph_input = build_input(pending)
+            async for update in graph.astream(graph_input, config, stream_mode="updates"):
+                for node, values in update.items():
+                    messages = (values or {}).get("messages", []) if isinstance(values, dict) else []
+                    if not isinstance(messages, list):
+                        messages = [messages]
+                    for message in messages:
+                        if isinstance(message, BaseMessage):
+                            yield _sse("message", {"node": node, **_serialize_message(message)})
+            pending = await _pending_tool_calls(config)
+            if pending:
+                yield _sse("approval_required", {"tool_calls": pending})
+            yield _sse("done", {"thread_id": config["configurable"]["thread_id"]})
+        except Exception as e:
+            yield _sse("error", {"detail": repr(e)})
+
+
+def _event_stream(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/threads")
+async def create_thread(request: Optional[CreateThreadRequest] = None) -> dict:
+    """Starts a new conversation thread for a passenger."""
+    thread_id = str(uuid.uuid4())
+    passenger_id = request.passenger_id if request else DEFAULT_PASSENGER_ID
+    _thread_passengers[thread_id] = passenger_id
+    return {"thread_id": thread_id, "passenger_id": passenger_id}
+
+
+@app.get("/threads/{thread_id}")
+async def get_thread(thread_id: str, passenger_id: Optional[str] = None) -> dict:
+    """Returns the thread's messages and any tool calls waiting for approval."""
+    config = _config(thread_id, passenger_id)
+    snapshot = await graph.aget_state(config)
+    messages = snapshot.values.get("messages", []) if snapshot.values else []
+    return {
+        "thread_id": thread_id,
+        "messages": [_serialize_message(message) for message in messages],
+        "pending_tool_calls": messages[-1].tool_calls if snapshot.next and messages else [],
+    }
+
+
+@app.delete("/threads/{thread_id}")
+async def delete_thread(thread_id: str, passenger_id: Optional[str] = None) -> dict:
+    """Ends a thread and frees its checkpoints. Waits for a turn in progress to finish first."""
+    _config(thread_id, passenger_id)
+    async with _thread_lock(thread_id):
+        if _thread_passengers.pop(thread_id, None) is not None:
+            graph.checkpointer.delete_thread(thread_id)
+    return {"thread_id": thread_id, "deleted": True}
+
+
+@app.get("/threads/{thread_id}/storage")
+async def get_thread_storage(thread_id: str, passenger_id: Optional[str] = None) -> dict:
+    """Returns how many bytes the thread's checkpoints occupy in this worker's memory."""
+    _config(thread_id, passenger_id)
+    return {"thread_id": thread_id, **conversation_bytes(graph.checkpointer, thread_id)}
+
+
+@app.post("/threads/{thread_id}/chat")
+async def chat(thread_id: str, request: ChatRequest) -> StreamingResponse:
+    """Sends a user message and streams the assistant's response."""
+    config = _config(thread_id, request.passenger_id)
+    if await _pending_tool_calls(config):
+        raise HTTPException(status_code=409, detail=AWAITING_APPROVAL)
+    return _event_stream(_stream_turn(config, lambda pending: {"messages": [("user", request.message)]}, resuming=False))
+
+
+@app.post("/threads/{thread_id}/approve")
+async def approve(thread_id: str, request: ResumeRequest) -> StreamingResponse:
+    """Approves the pending sensitive tool calls and streams the rest of the turn."""
+    config = _config(thread_id, request.passenger_id)
+    if not await _pending_tool_calls(config):
+        raise HTTPException(status_code=409, detail=NOTHING_PENDING)
+    return _event_stream(_stream_turn(config, lambda pending: None, resuming=True))
+
+
+@app.post("/threads/{thread_id}/deny")
+async def deny(thread_id: str, request: ResumeRequest) -> StreamingResponse:
+    """Denies the pending sensitive tool calls and lets the assistant re-plan."""
+    config = _config(thread_id, request.passenger_id)
+    if not await _pending_tool_calls(config):
+        raise HTTPException(status_code=409, detail=NOTHING_PENDING)
+    content = DENIAL_MESSAGE if not request.reason else f"{DENIAL_MESSAGE} Reason: {request.reason}"
+
+    def denials(pending: list[dict]) -> dict:
+        return {"messages": [ToolMessage(content=content, tool_call_id=tool_call["id"]) for tool_call in pending]}
+
+    return _event_stream(_stream_turn(config, denials, resuming=True))
+
+
+@app.get("/metrics")
+async def metrics() -> dict:
+    """Returns per-assistant LLM metrics and resource queue depths for this worker."""
+    return {
+        "llm_calls": llm_call_stats(),
+        "prompt_cache": prompt_cache_stats(),
+        "preroute": preroute_stats(),
+        "coalesced": {**coalesced_call_stats(), "embeddings": embedding_single_flight.coalesced},
+        "admission": admission_stats(),
+        "checkpoint_store": _checkpoint_store_stats(),
+    }
+
+
+def _checkpoint_store_stats() -> dict:
+    if not isinstance(graph.checkpointer, CompactingSaver):
+        return {}
+    serde = graph.checkpointer.serde
+    return {**serde.stats, "payload_bytes": serde.store_bytes()}
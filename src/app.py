@@ -3,7 +3,7 @@ import os
 import uuid
 import streamlit as st
 from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from langchain_core.messages import HumanMessage, ToolMessage
 
 # --- Load Environment Variables FIRST ---
 load_dotenv() 
@@ -13,9 +13,17 @@ from utils.db_setup import setup_database
 db_path = setup_database()
 os.environ["DB_PATH"] = db_path 
 
+from utils.db_connection import start_snapshot_refresher
+if os.getenv("DB_SNAPSHOT_REFRESH_SECONDS"):
+    start_snapshot_refresher(db_path, float(os.environ["DB_SNAPSHOT_REFRESH_SECONDS"]))
+
 # --- Import the rest of the app modules THIRD ---
 from utils.vectorstore_setup import setup_vector_store
+from tools.policy_tools import set_policy_retriever
 from assistants.graph import get_graph
+from assistants.metrics import llm_call_stats, prompt_cache_stats
+from utils.admission import admission_stats
+from utils.chat_history import displayable_messages, trim_thread_history
 
 st.set_page_config(page_title="Swiss Airlines Support Bot", layout="wide")
 
@@ -36,39 +44,52 @@ if not keys_loaded:
 
 # --- Setup Utilities ---
 vector_retriever = setup_vector_store()
+set_policy_retriever(vector_retriever)
 
 @st.cache_resource
 def load_graph():
     return get_graph()
 graph = load_graph()
 
+# --- Sidebar Metrics ---
+with st.sidebar.expander("Prompt cache"):
+    st.json(prompt_cache_stats())
+with st.sidebar.expander("LLM calls by tier"):
+    st.json(llm_call_stats())
+with st.sidebar.expander("Resource queues"):
+    st.json(admission_stats())
+
 # --- Title and Session State ---
 st.title("✈️ Swiss Airlines Support Assistant")
 st.markdown("I can help with flight information, policy questions, and booking hotels, cars, or excursions.")
 
-if "messages" not in st.session_state:
-    st.session_state.messages = []
 if "thread_id" not in st.session_state:
     st.session_state.thread_id = str(uuid.uuid4())
+if "history_pages" not in st.session_state:
+    st.session_state.history_pages = 1
 
-# --- Display existing chat messages ---
-for msg in st.session_state.messages:
-    if isinstance(msg, AIMessage) and msg.tool_calls:
-        if msg.content:
-            with st.chat_message("ai"):
-                st.markdown(msg.content)
-    elif isinstance(msg, AIMessage):
-        with st.chat_message("ai"):
-            st.markdown(msg.content)
-    elif isinstance(msg, HumanMessage):
-        with st.chat_message("user"):
-            st.markdown(msg.content)
+# --- History Limits ---
+# Messages live only in the graph's checkpointer; the UI renders the most recent page(s)
+# from it, and threads are trimmed to a fixed number of retained messages.
+HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "20"))
+MAX_RETAINED_MESSAGES = int(os.getenv("CHAT_MAX_RETAINED_MESSAGES", "200"))
 
-# --- Main Interaction Logic ---
 config = {"configurable": {"passenger_id": "3442 587242", "thread_id": st.session_state.thread_id}}
+snapshot = graph.get_state(config)
 
+# --- Display existing chat messages ---
+history = displayable_messages(snapshot.values.get("messages", []))
+visible_count = HISTORY_PAGE_SIZE * st.session_state.history_pages
+if len(history) > visible_count:
+    if st.button(f"Show earlier messages ({len(history) - visible_count} hidden)", key="show_earlier"):
+        st.session_state.history_pages += 1
+        st.rerun()
+for msg in history[-visible_count:]:
+    with st.chat_message("user" if isinstance(msg, HumanMessage) else "ai"):
+        st.markdown(msg.content)
+
+# --- Main Interaction Logic ---
 def process_and_display_response(user_input):
-    st.session_state.messages.append(HumanMessage(content=user_input))
     with st.chat_message("user"):
         st.markdown(user_input)
     with st.chat_message("ai"):
@@ -79,11 +100,10 @@ def process_and_display_response(user_input):
                 if "messages" in event:
                     full_response = event["messages"][-1]
             if full_response and full_response.content:
-                st.session_state.messages.append(full_response)
                 st.markdown(full_response.content)
+    trim_thread_history(graph, config, MAX_RETAINED_MESSAGES)
 
 # Check if the agent is interrupted waiting for tool approval
-snapshot = graph.get_state(config)
 if snapshot.next:
     with st.chat_message("ai"):
         st.markdown("I need to perform the following actions. Do you approve?")
@@ -94,13 +114,8 @@ if snapshot.next:
     with col1:
         if st.button("Approve", use_container_width=True, key="approve_button"):
             with st.spinner("Continuing..."):
-                events = graph.stream(None, config, stream_mode="values")
-                final_response = None
-                for event in events:
-                    if "messages" in event:
-                         final_response = event["messages"][-1]
-                if final_response:
-                    st.session_state.messages.append(final_response)
+                graph.invoke(None, config)
+                trim_thread_history(graph, config, MAX_RETAINED_MESSAGES)
                 st.rerun()
 
     with col2:
@@ -108,13 +123,8 @@ if snapshot.next:
             tool_call_id = snapshot.values['messages'][-1].tool_calls[0]['id']
             denial_message = ToolMessage(content="The user denied this tool call. Please ask for clarification.", tool_call_id=tool_call_id)
             with st.spinner("Re-routing..."):
-                events = graph.stream({"messages": [denial_message]}, config, stream_mode="values")
-                final_response = None
-                for event in events:
-                    if "messages" in event:
-                         final_response = event["messages"][-1]
-                if final_response:
-                    st.session_state.messages.append(final_response)
+                graph.invoke({"messages": [denial_message]}, config)
+                trim_thread_history(graph, config, MAX_RETAINED_MESSAGES)
                 st.rerun()
 else:
     # If not interrupted, show the chat input and demo buttons
@@ -147,8 +157,8 @@ else:
 
     if st.button("Start Demo", key="start_demo"):
         # Reset chat and start demo from the beginning
-        st.session_state.messages = []
         st.session_state.thread_id = str(uuid.uuid4())
+        st.session_state.history_pages = 1
         st.session_state.demo_step = 0
         st.session_state.demo_mode = True
         st.rerun()
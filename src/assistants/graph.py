@@ -1,11 +1,14 @@
 # src/assistants/graph.py
+import hashlib
+import json
+import os
+import time
+import uuid
 from datetime import datetime
 from typing import Annotated, Literal, Optional, Callable
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
-from langchain_core.messages import ToolMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_tavily import TavilySearch
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import AnyMessage, add_messages
@@ -14,6 +17,12 @@ from pydantic import BaseModel, Field
 from typing_extensions import TypedDict
 
 from tools import *
+from utils.admission import LLM, Overloaded, limiter
+from utils.checkpoint_store import CompactingSaver
+from utils.single_flight import SingleFlight
+from assistants.metrics import record_coalesced_call, record_llm_call, record_preroute, record_prompt_cache
+from assistants.models import ASSISTANT_TIERS, FAST_TIER, MODEL_TIERS, STRONG_TIER, escalation_enabled, estimate_cost, get_assistant_model, get_chat_model
+from assistants.router import PREROUTER_ENABLED, classify_intent
 
 # --- State Definition ---
 def update_dialog_stack(left: list[str], right: Optional[str]) -> list[str]:
@@ -33,18 +42,85 @@ class State(TypedDict):
     ]
 
 # --- Assistants and Prompts ---
+LLM_COALESCING = os.getenv("LLM_COALESCING", "1").lower() in ("1", "true", "yes")
+CHECKPOINT_COMPACTION = os.getenv("CHECKPOINT_COMPACTION", "1").lower() in ("1", "true", "yes")
+llm_single_flight = SingleFlight()
+
+def prompt_fingerprint(messages: list) -> str:
+    """Hashes a rendered prompt by role, text and tool calls, ignoring per-session message and tool call IDs."""
+    parts = [
+        [msg.type, msg.content, [[tc["name"], tc["args"]] for tc in getattr(msg, "tool_calls", [])]]
+        for msg in messages
+    ]
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+BUSY_MESSAGE = "We're handling an unusually high number of requests right now. Please send your message again in a moment."
+
 class Assistant:
-    def __init__(self, runnable: Runnable):
+    def __init__(self, runnable: Runnable, name: str = "assistant", escalation_runnable: Optional[Runnable] = None, sensitive_tools: list = ()):
         self.runnable = runnable
+        self.name = name
+        self.tier = ASSISTANT_TIERS.get(name, FAST_TIER)
+        self.escalation_runnable = escalation_runnable if escalation_runnable and escalation_enabled(name) else None
+        self.sensitive_tool_names = {t.name for t in sensitive_tools}
+
+    def _invoke(self, runnable: Runnable, tier: str, state: State):
+        start = time.perf_counter()
+        result, shared = self._coalesced_invoke(runnable, tier, state)
+        latency = time.perf_counter() - start
+        if shared:
+            record_coalesced_call(self.name)
+            return result
+        model = MODEL_TIERS[tier]
+        usage = result.usage_metadata or {}
+        input_tokens, output_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        record_llm_call(self.name, tier, model, latency, input_tokens, output_tokens, estimate_cost(model, input_tokens, output_tokens))
+        record_prompt_cache(self.name, result)
+        return result
+
+    def _coalesced_invoke(self, runnable: Runnable, tier: str, state: State):
+        """Invokes the runnable, sharing one LLM call among concurrent identical prompts.
+
+        All models run at temperature 0, so two sessions that render the same prompt for the
+        same assistant and tier would get the same answer; only one request is sent. Returns
+        the result and whether it was shared from another session's call.
+        """
+        if not LLM_COALESCING:
+            return self._admitted_invoke(runnable, state), False
+        prompt_messages = runnable.first.invoke(state).to_messages()
+        key = (self.name, tier, id(runnable), prompt_fingerprint(prompt_messages))
+        result, shared = llm_single_flight.do_shared(key, lambda: self._admitted_invoke(runnable, state))
+        # Each caller gets its own copy, since the graph assigns message IDs in place.
+        return result.model_copy(deep=True), shared
+
+    @staticmethod
+    def _admitted_invoke(runnable: Runnable, state: State):
+        """Invokes the runnable once it holds an LLM provider slot. Coalesced followers don't take one."""
+        with limiter(LLM).acquire():
+            return runnable.invoke(state)
 
     def __call__(self, state: State, config: RunnableConfig):
+        try:
+            return self._respond(state)
+        except Overloaded:
+            # Shed under load: end the turn with a short answer instead of queueing indefinitely.
+            return {"messages": AIMessage(content=BUSY_MESSAGE)}
+
+    def _invoke_until_answered(self, runnable: Runnable, tier: str, state: State):
+        """Invokes the runnable, asking again whenever it returns neither text nor tool calls."""
         while True:
-            result = self.runnable.invoke(state)
+            result = self._invoke(runnable, tier, state)
             if not result.tool_calls and (not result.content or isinstance(result.content, list) and not result.content[0].get("text")):
                 messages = state["messages"] + [("user", "Respond with a real output.")]
                 state = {**state, "messages": messages}
             else:
-                break
+                return result
+
+    def _respond(self, state: State):
+        result = self._invoke_until_answered(self.runnable, self.tier, state)
+        if self.escalation_runnable and any(tc["name"] in self.sensitive_tool_names for tc in result.tool_calls):
+            # The regular model wants to take a sensitive action; let the strong model make that call.
+            result = self._invoke_until_answered(self.escalation_runnable, STRONG_TIER, state)
         return {"messages": result}
 
 class CompleteOrEscalate(BaseModel):
@@ -52,7 +128,22 @@ class CompleteOrEscalate(BaseModel):
     cancel: bool = True
     reason: str
 
-llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0)
+strong_llm = get_chat_model(STRONG_TIER)
+
+# Prompt layout: the static system instructions and the bound tool schemas come first and
+# never change between calls, so the provider can serve them from its prompt cache. Values
+# that change per call (current time, the user's flights) are sent in a context message
+# after the conversation instead of being interpolated into the system message.
+CONTEXT_NOTE = (
+    "\n\nThe last message holds context supplied by the system inside <context> tags "
+    "(such as the current time and the user's flights). It was not written by the customer; use it, but do not reply to it."
+)
+FLIGHT_CONTEXT = ("human", "<context>\nCurrent user flight information:\n<Flights>\n{user_info}\n</Flights>\nCurrent time: {time}.\n</context>")
+TIME_CONTEXT = ("human", "<context>\nCurrent time: {time}.\n</context>")
+
+def current_time() -> str:
+    """The current time to the minute, so identical requests within a minute render identically."""
+    return datetime.now().strftime("%Y-%m-%d %H:%M")
 
 # Flight booking assistant
 flight_booking_prompt = ChatPromptTemplate.from_messages(
@@ -65,17 +156,18 @@ flight_booking_prompt = ChatPromptTemplate.from_messages(
             "When searching, be persistent. Expand your query bounds if the first search returns no results. "
             "If you need more information or the customer changes their mind, escalate the task back to the main assistant."
             "Remember that a booking isn't completed until after the relevant tool has successfully been used."
-            "\n\nCurrent user flight information:\n<Flights>\n{user_info}\n</Flights>"
-            "\nCurrent time: {time}."
-            '\n\nIf the user needs help, and none of your tools are appropriate for it, then "CompleteOrEscalate" the dialog to the host assistant.',
+            '\n\nIf the user needs help, and none of your tools are appropriate for it, then "CompleteOrEscalate" the dialog to the host assistant.'
+            + CONTEXT_NOTE,
         ),
         ("placeholder", "{messages}"),
+        FLIGHT_CONTEXT,
     ]
-).partial(time=datetime.now)
-update_flight_safe_tools = [search_flights]
-update_flight_sensitive_tools = [update_ticket_to_new_flight, cancel_ticket]
+).partial(time=current_time)
+update_flight_safe_tools = [search_flights, search_itineraries]
+update_flight_sensitive_tools = [update_ticket_to_new_flight, cancel_ticket, cancel_tickets]
 update_flight_tools = update_flight_safe_tools + update_flight_sensitive_tools
-update_flight_runnable = flight_booking_prompt | llm.bind_tools(update_flight_tools + [CompleteOrEscalate])
+update_flight_runnable = flight_booking_prompt | get_assistant_model("update_flight").bind_tools(update_flight_tools + [CompleteOrEscalate])
+update_flight_escalation_runnable = flight_booking_prompt | strong_llm.bind_tools(update_flight_tools + [CompleteOrEscalate])
 
 # Hotel Booking Assistant
 book_hotel_prompt = ChatPromptTemplate.from_messages(
@@ -88,16 +180,18 @@ book_hotel_prompt = ChatPromptTemplate.from_messages(
             "When searching, be persistent. Expand your query bounds if the first search returns no results. "
             "If you need more information or the customer changes their mind, escalate the task back to the main assistant."
             "Remember that a booking isn't completed until after the relevant tool has successfully been used."
-            "\nCurrent time: {time}."
-            '\n\nIf the user needs help, and none of your tools are appropriate for it, then "CompleteOrEscalate" the dialog to the host assistant.',
+            '\n\nIf the user needs help, and none of your tools are appropriate for it, then "CompleteOrEscalate" the dialog to the host assistant.'
+            + CONTEXT_NOTE,
         ),
         ("placeholder", "{messages}"),
+        TIME_CONTEXT,
     ]
-).partial(time=datetime.now)
+).partial(time=current_time)
 book_hotel_safe_tools = [search_hotels]
-book_hotel_sensitive_tools = [book_hotel, update_hotel, cancel_hotel]
+book_hotel_sensitive_tools = [book_hotel, book_hotels, update_hotel, cancel_hotel, cancel_hotels]
 book_hotel_tools = book_hotel_safe_tools + book_hotel_sensitive_tools
-book_hotel_runnable = book_hotel_prompt | llm.bind_tools(book_hotel_tools + [CompleteOrEscalate])
+book_hotel_runnable = book_hotel_prompt | get_assistant_model("book_hotel").bind_tools(book_hotel_tools + [CompleteOrEscalate])
+book_hotel_escalation_runnable = book_hotel_prompt | strong_llm.bind_tools(book_hotel_tools + [CompleteOrEscalate])
 
 # Car Rental Assistant
 book_car_rental_prompt = ChatPromptTemplate.from_messages(
@@ -110,16 +204,18 @@ book_car_rental_prompt = ChatPromptTemplate.from_messages(
             "When searching, be persistent. Expand your query bounds if the first search returns no results. "
             "If you need more information or the customer changes their mind, escalate the task back to the main assistant."
             "Remember that a booking isn't completed until after the relevant tool has successfully been used."
-            "\nCurrent time: {time}."
-            '\n\nIf the user needs help, and none of your tools are appropriate for it, then "CompleteOrEscalate" the dialog to the host assistant.',
+            '\n\nIf the user needs help, and none of your tools are appropriate for it, then "CompleteOrEscalate" the dialog to the host assistant.'
+            + CONTEXT_NOTE,
         ),
         ("placeholder", "{messages}"),
+        TIME_CONTEXT,
     ]
-).partial(time=datetime.now)
+).partial(time=current_time)
 book_car_rental_safe_tools = [search_car_rentals]
-book_car_rental_sensitive_tools = [book_car_rental, update_car_rental, cancel_car_rental]
+book_car_rental_sensitive_tools = [book_car_rental, book_car_rentals, update_car_rental, cancel_car_rental, cancel_car_rentals]
 book_car_rental_tools = book_car_rental_safe_tools + book_car_rental_sensitive_tools
-book_car_rental_runnable = book_car_rental_prompt | llm.bind_tools(book_car_rental_tools + [CompleteOrEscalate])
+book_car_rental_runnable = book_car_rental_prompt | get_assistant_model("book_car_rental").bind_tools(book_car_rental_tools + [CompleteOrEscalate])
+book_car_rental_escalation_runnable = book_car_rental_prompt | strong_llm.bind_tools(book_car_rental_tools + [CompleteOrEscalate])
 
 # Excursion Assistant
 book_excursion_prompt = ChatPromptTemplate.from_messages(
@@ -132,16 +228,18 @@ book_excursion_prompt = ChatPromptTemplate.from_messages(
             "If you need more information or the customer changes their mind, escalate the task back to the main assistant."
             "When searching, be persistent. Expand your query bounds if the first search returns no results. "
             "Remember that a booking isn't completed until after the relevant tool has successfully been used."
-            "\nCurrent time: {time}."
-            '\n\nIf the user needs help, and none of your tools are appropriate for it, then "CompleteOrEscalate" the dialog to the host assistant.',
+            '\n\nIf the user needs help, and none of your tools are appropriate for it, then "CompleteOrEscalate" the dialog to the host assistant.'
+            + CONTEXT_NOTE,
         ),
         ("placeholder", "{messages}"),
+        TIME_CONTEXT,
     ]
-).partial(time=datetime.now)
+).partial(time=current_time)
 book_excursion_safe_tools = [search_trip_recommendations]
-book_excursion_sensitive_tools = [book_excursion, update_excursion, cancel_excursion]
+book_excursion_sensitive_tools = [book_excursion, book_excursions, update_excursion, cancel_excursion, cancel_excursions]
 book_excursion_tools = book_excursion_safe_tools + book_excursion_sensitive_tools
-book_excursion_runnable = book_excursion_prompt | llm.bind_tools(book_excursion_tools + [CompleteOrEscalate])
+book_excursion_runnable = book_excursion_prompt | get_assistant_model("book_excursion").bind_tools(book_excursion_tools + [CompleteOrEscalate])
+book_excursion_escalation_runnable = book_excursion_prompt | strong_llm.bind_tools(book_excursion_tools + [CompleteOrEscalate])
 
 # Primary Assistant
 class ToFlightBookingAssistant(BaseModel):
@@ -180,14 +278,14 @@ primary_assistant_prompt = ChatPromptTemplate.from_messages(
             "Provide detailed information to the customer, and always double-check the database before concluding that information is unavailable. "
             "When searching, be persistent. Expand your query bounds if the first search returns no results. "
             "If a search comes up empty, expand your search before giving up."
-            "\n\nCurrent user flight information:\n<Flights>\n{user_info}\n</Flights>"
-            "\nCurrent time: {time}.",
+            + CONTEXT_NOTE,
         ),
         ("placeholder", "{messages}"),
+        FLIGHT_CONTEXT,
     ]
-).partial(time=datetime.now)
-primary_assistant_tools = [TavilySearch(max_results=1), search_flights, lookup_policy]
-assistant_runnable = primary_assistant_prompt | llm.bind_tools(
+).partial(time=current_time)
+primary_assistant_tools = [web_search, search_flights, search_itineraries, lookup_policy]
+assistant_runnable = primary_assistant_prompt | get_assistant_model("primary_assistant").bind_tools(
     primary_assistant_tools + [ToFlightBookingAssistant, ToBookCarRental, ToHotelBookingAssistant, ToBookExcursion]
 )
 
@@ -195,7 +293,11 @@ assistant_runnable = primary_assistant_prompt | llm.bind_tools(
 def handle_tool_error(state) -> dict:
     error = state.get("error")
     tool_calls = state["messages"][-1].tool_calls
-    return {"messages": [ToolMessage(content=f"Error: {repr(error)}\n please fix your mistakes.", tool_call_id=tc["id"]) for tc in tool_calls]}
+    if isinstance(error, Overloaded):
+        content = f"Error: {error} Nothing was changed. Tell the user the system is busy and to try again shortly."
+    else:
+        content = f"Error: {repr(error)}\n please fix your mistakes."
+    return {"messages": [ToolMessage(content=content, tool_call_id=tc["id"]) for tc in tool_calls]}
 
 def create_tool_node_with_fallback(tools: list) -> ToolNode:
     return ToolNode(tools).with_fallbacks([RunnableLambda(handle_tool_error)], exception_key="error")
@@ -221,7 +323,7 @@ def get_graph():
 
     # Flight booking assistant
     builder.add_node("enter_update_flight", create_entry_node("Flight Updates & Booking Assistant", "update_flight"))
-    builder.add_node("update_flight", Assistant(update_flight_runnable))
+    builder.add_node("update_flight", Assistant(update_flight_runnable, name="update_flight", escalation_runnable=update_flight_escalation_runnable, sensitive_tools=update_flight_sensitive_tools))
     builder.add_edge("enter_update_flight", "update_flight")
     builder.add_node("update_flight_sensitive_tools", create_tool_node_with_fallback(update_flight_sensitive_tools))
     builder.add_node("update_flight_safe_tools", create_tool_node_with_fallback(update_flight_safe_tools))
@@ -249,7 +351,7 @@ def get_graph():
 
     # Car rental assistant
     builder.add_node("enter_book_car_rental", create_entry_node("Car Rental Assistant", "book_car_rental"))
-    builder.add_node("book_car_rental", Assistant(book_car_rental_runnable))
+    builder.add_node("book_car_rental", Assistant(book_car_rental_runnable, name="book_car_rental", escalation_runnable=book_car_rental_escalation_runnable, sensitive_tools=book_car_rental_sensitive_tools))
     builder.add_edge("enter_book_car_rental", "book_car_rental")
     builder.add_node("book_car_rental_safe_tools", create_tool_node_with_fallback(book_car_rental_safe_tools))
     builder.add_node("book_car_rental_sensitive_tools", create_tool_node_with_fallback(book_car_rental_sensitive_tools))
@@ -268,7 +370,7 @@ def get_graph():
 
     # Hotel booking assistant
     builder.add_node("enter_book_hotel", create_entry_node("Hotel Booking Assistant", "book_hotel"))
-    builder.add_node("book_hotel", Assistant(book_hotel_runnable))
+    builder.add_node("book_hotel", Assistant(book_hotel_runnable, name="book_hotel", escalation_runnable=book_hotel_escalation_runnable, sensitive_tools=book_hotel_sensitive_tools))
     builder.add_edge("enter_book_hotel", "book_hotel")
     builder.add_node("book_hotel_safe_tools", create_tool_node_with_fallback(book_hotel_safe_tools))
     builder.add_node("book_hotel_sensitive_tools", create_tool_node_with_fallback(book_hotel_sensitive_tools))
@@ -287,7 +389,7 @@ def get_graph():
 
     # Excursion assistant
     builder.add_node("enter_book_excursion", create_entry_node("Trip Recommendation Assistant", "book_excursion"))
-    builder.add_node("book_excursion", Assistant(book_excursion_runnable))
+    builder.add_node("book_excursion", Assistant(book_excursion_runnable, name="book_excursion", escalation_runnable=book_excursion_escalation_runnable, sensitive_tools=book_excursion_sensitive_tools))
     builder.add_edge("enter_book_excursion", "book_excursion")
     builder.add_node("book_excursion_safe_tools", create_tool_node_with_fallback(book_excursion_safe_tools))
     builder.add_node("book_excursion_sensitive_tools", create_tool_node_with_fallback(book_excursion_sensitive_tools))
@@ -305,7 +407,7 @@ def get_graph():
     builder.add_conditional_edges("book_excursion", route_book_excursion, ["book_excursion_safe_tools", "book_excursion_sensitive_tools", "leave_skill", END])
 
     # Primary assistant
-    builder.add_node("primary_assistant", Assistant(assistant_runnable))
+    builder.add_node("primary_assistant", Assistant(assistant_runnable, name="primary_assistant"))
     builder.add_node("primary_assistant_tools", create_tool_node_with_fallback(primary_assistant_tools))
     def route_primary_assistant(state: State):
         route = tools_condition(state)
@@ -321,14 +423,32 @@ def get_graph():
     builder.add_conditional_edges("primary_assistant", route_primary_assistant, ["enter_update_flight", "enter_book_car_rental", "enter_book_hotel", "enter_book_excursion", "primary_assistant_tools", END])
     builder.add_edge("primary_assistant_tools", "primary_assistant")
 
+    # Optional intent pre-router: clearly scoped turns skip the primary assistant's LLM call
+    # by emitting the same delegation tool call the LLM would have made.
+    def intent_router(state: State):
+        last_message = state["messages"][-1]
+        intent = classify_intent(last_message.content) if isinstance(last_message, HumanMessage) else None
+        record_preroute(intent.tool_name if intent else None)
+        if not intent:
+            return {}
+        tool_call = {"id": f"preroute_{uuid.uuid4().hex}", "name": intent.tool_name, "args": intent.args}
+        return {"messages": AIMessage(content="", tool_calls=[tool_call])}
+    builder.add_node("intent_router", intent_router)
+    def route_intent_router(state: State):
+        last_message = state["messages"][-1]
+        if isinstance(last_message, AIMessage) and last_message.tool_calls:
+            return route_primary_assistant(state)
+        return "primary_assistant"
+    builder.add_conditional_edges("intent_router", route_intent_router, ["enter_update_flight", "enter_book_car_rental", "enter_book_hotel", "enter_book_excursion", "primary_assistant"])
+
     def route_to_workflow(state: State):
         dialog_state = state.get("dialog_state")
-        if not dialog_state: return "primary_assistant"
+        if not dialog_state: return "intent_router" if PREROUTER_ENABLED else "primary_assistant"
         return dialog_state[-1]
     
     builder.add_conditional_edges("fetch_user_info", route_to_workflow)
     
-    memory = InMemorySaver()
+    memory = CompactingSaver() if CHECKPOINT_COMPACTION else InMemorySaver()
     overall_graph = builder.compile(
         checkpointer=memory,
         interrupt_before=[
@@ -0,0 +1,85 @@
+# src/assistants/metrics.py
+import threading
+from collections import defaultdict
+
+from langchain_core.messages import AIMessage
+
+# --- Per-Assistant LLM Metrics ---
+# Counters are kept per worker process and keyed by assistant name (the graph node name).
+
+_lock = threading.Lock()
+_prompt_cache = defaultdict(lambda: {"calls": 0, "cache_hits": 0, "input_tokens": 0, "cached_input_tokens": 0})
+_preroute = defaultdict(int)
+_coalesced = defaultdict(int)
+_llm_calls = defaultdict(lambda: {"calls": 0, "latency_s": 0.0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0})
+
+
+def record_prompt_cache(assistant: str, message: AIMessage) -> None:
+    """Records how much of an LLM call's prompt was served from the provider's prompt cache."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+    with _lock:
+        stats = _prompt_cache[assistant]
+        stats["calls"] += 1
+        stats["input_tokens"] += usage.get("input_tokens", 0) or 0
+        stats["cached_input_tokens"] += cached
+        if cached:
+            stats["cache_hits"] += 1
+
+
+def prompt_cache_stats() -> dict[str, dict]:
+    """Returns prompt-cache counters per assistant, with the hit rate and cached token share."""
+    with _lock:
+        report = {}
+        for assistant, stats in _prompt_cache.items():
+            report[assistant] = {
+                **stats,
+                "hit_rate": stats["cache_hits"] / stats["calls"] if stats["calls"] else 0.0,
+                "cached_token_ratio": stats["cached_input_tokens"] / stats["input_tokens"] if stats["input_tokens"] else 0.0,
+            }
+        return report
+
+
+def record_preroute(tool_name: str | None) -> None:
+    """Counts pre-router decisions: a routing tool name, or None when the LLM router is used."""
+    with _lock:
+        _preroute[tool_name or "fallback"] += 1
+
+
+def preroute_stats() -> dict[str, int]:
+    """Returns how many turns the intent pre-router sent to each workflow or to the LLM router."""
+    with _lock:
+        return dict(_preroute)
+
+
+def record_llm_call(assistant: str, tier: str, model: str, latency_s: float, input_tokens: int, output_tokens: int, cost_usd: float) -> None:
+    """Accumulates latency, tokens and estimated cost for an LLM call, per model tier and per assistant."""
+    with _lock:
+        for key in (f"tier:{tier}:{model}", f"assistant:{assistant}:{tier}"):
+            stats = _llm_calls[key]
+            stats["calls"] += 1
+            stats["latency_s"] += latency_s
+            stats["input_tokens"] += input_tokens or 0
+            stats["output_tokens"] += output_tokens or 0
+            stats["cost_usd"] += cost_usd
+
+
+def llm_call_stats() -> dict[str, dict]:
+    """Returns LLM call counters keyed by "tier:<tier>:<model>" and "assistant:<name>:<tier>"."""
+    with _lock:
+        return {
+            key: {**stats, "avg_latency_s": stats["latency_s"] / stats["calls"] if stats["calls"] else 0.0}
+            for key, stats in _llm_calls.items()
+        }
+
+
+def record_coalesced_call(name: str) -> None:
+    """Counts a request that shared the result of an identical in-flight call instead of sending its own."""
+    with _lock:
+        _coalesced[name] += 1
+
+
+def coalesced_call_stats() -> dict[str, int]:
+    """Returns how many LLM requests were served by coalescing, per assistant."""
+    with _lock:
+        return dict(_coalesced)
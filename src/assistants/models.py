@@ -0,0 +1,57 @@
+# src/assistants/models.py
+import os
+from functools import lru_cache
+from langchain.chat_models import init_chat_model
+from langchain_core.language_models import BaseChatModel
+
+# --- Model Tiers ---
+# Models are given as "<provider>:<model>" strings understood by `init_chat_model`, e.g.
+# "google_genai:gemini-1.5-flash", "groq:llama-3.1-8b-instant" or "openai:gpt-4o".
+FAST_TIER = "fast"
+STRONG_TIER = "strong"
+MODEL_TIERS = {
+    FAST_TIER: os.getenv("LLM_FAST_MODEL", "google_genai:gemini-1.5-flash"),
+    STRONG_TIER: os.getenv("LLM_STRONG_MODEL", "google_genai:gemini-1.5-flash"),
+}
+
+# Tier each assistant uses for its regular turns, overridable per assistant with
+# LLM_TIER_<ASSISTANT NAME>, e.g. LLM_TIER_BOOK_HOTEL=strong. Turns that end in a sensitive
+# tool call are escalated to the strong tier regardless (see Assistant in graph.py).
+ASSISTANT_TIERS = {
+    name: os.getenv(f"LLM_TIER_{name.upper()}", FAST_TIER)
+    for name in ["primary_assistant", "update_flight", "book_car_rental", "book_hotel", "book_excursion"]
+}
+
+# USD per million (input, output) tokens, used for per-tier cost accounting. Models that
+# aren't listed are counted at zero cost.
+MODEL_PRICES = {
+    "google_genai:gemini-1.5-flash": (0.075, 0.30),
+    "google_genai:gemini-1.5-pro": (1.25, 5.00),
+    "google_genai:gemini-2.5-flash": (0.30, 2.50),
+    "groq:llama-3.1-8b-instant": (0.05, 0.08),
+    "groq:llama-3.3-70b-versatile": (0.59, 0.79),
+    "openai:gpt-4o-mini": (0.15, 0.60),
+    "openai:gpt-4o": (2.50, 10.00),
+}
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(tier: str) -> BaseChatModel:
+    """Returns the shared chat model for a tier."""
+    return init_chat_model(MODEL_TIERS[tier], temperature=0)
+
+
+def get_assistant_model(assistant: str) -> BaseChatModel:
+    """Returns the chat model for an assistant's regular turns."""
+    return get_chat_model(ASSISTANT_TIERS[assistant])
+
+
+def escalation_enabled(assistant: str) -> bool:
+    """Whether escalating an assistant's sensitive turns would actually switch models."""
+    return MODEL_TIERS[ASSISTANT_TIERS[assistant]] != MODEL_TIERS[STRONG_TIER]
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """Estimated USD cost of a call, from MODEL_PRICES."""
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
@@ -0,0 +1,176 @@
+# src/assistants/router.py
+import argparse
+import os
+import re
+import sys
+from typing import NamedTuple, Optional
+
+# --- Intent Pre-Router ---
+# A CPU-only keyword classifier that runs before the primary assistant. When a user turn is
+# clearly about one of the specialized workflows, the graph enters that workflow directly
+# and skips the primary assistant's LLM call. Anything ambiguous falls back to the LLM router.
+PREROUTER_ENABLED = os.getenv("INTENT_PREROUTER", "0").lower() in ("1", "true", "yes")
+PREROUTER_THRESHOLD = float(os.getenv("INTENT_PREROUTER_THRESHOLD", "0.8"))
+PREROUTER_MIN_SCORE = 3
+
+# Weighted phrases per delegation tool. Keys are the names of the primary assistant's
+# routing tools in assistants/graph.py.
+INTENT_KEYWORDS = {
+    "ToFlightBookingAssistant": {
+        "change my flight": 3, "update my flight": 3, "move my flight": 3, "reschedule": 3, "rebook": 3,
+        "cancel my flight": 3, "cancel my ticket": 3, "earlier flight": 2, "later flight": 2, "different flight": 2,
+    },
+    "ToHotelBookingAssistant": {
+        "hotel": 3, "hotels": 3, "accommodation": 2, "lodging": 2, "place to stay": 2, "room": 1, "check-in": 1,
+    },
+    "ToBookCarRental": {
+        "rent a car": 3, "car rental": 3, "rental car": 3, "car hire": 3, "car": 1, "cars": 1, "vehicle": 1,
+    },
+    "ToBookExcursion": {
+        "excursion": 3, "excursions": 3, "trip recommendation": 3, "trip recommendations": 3, "tour": 2, "tours": 2,
+        "museum": 2, "museums": 2, "sightseeing": 2, "things to do": 2, "activity": 1, "activities": 1,
+    },
+}
+
+# A turn is only pre-routed if it asks for something to be done. Mentioning a hotel or a
+# car in passing ("is there a hotel shuttle to the airport?") is not enough, and neither
+# is a question about one that happens to contain a verb ("do I need a visa to rent a car?").
+ACTION_CUES = [
+    "book", "reserve", "rent", "hire", "find", "search", "look for", "looking for", "get me", "show me",
+    "recommend", "suggest", "cancel", "change", "update", "move", "reschedule", "rebook", "switch",
+]
+QUESTION_OPENERS = ["do", "does", "did", "is", "are", "was", "were", "where", "what", "what's", "when", "why", "how", "which", "who", "will"]
+
+# Turns that mention these are questions the primary assistant answers itself (policies,
+# flight status, airport transfers), even if they also mention a workflow, so they always go to the LLM.
+FALLBACK_KEYWORDS = ["policy", "policies", "allowed", "permitted", "fee", "fees", "refund", "baggage", "what time", "status", "shuttle"]
+
+_ROUTING_ARGS = {
+    "ToFlightBookingAssistant": [],
+    "ToHotelBookingAssistant": ["location", "checkin_date", "checkout_date"],
+    "ToBookCarRental": ["location", "start_date", "end_date"],
+    "ToBookExcursion": ["location"],
+}
+
+
+class Intent(NamedTuple):
+    tool_name: str
+    confidence: float
+    args: dict
+
+
+def _phrase_pattern(phrase: str) -> re.Pattern:
+    return re.compile(rf"\b{re.escape(phrase)}\b", re.IGNORECASE)
+
+
+_INTENT_PATTERNS = {
+    tool_name: [(_phrase_pattern(phrase), weight) for phrase, weight in phrases.items()]
+    for tool_name, phrases in INTENT_KEYWORDS.items()
+}
+_FALLBACK_PATTERNS = [_phrase_pattern(phrase) for phrase in FALLBACK_KEYWORDS]
+_ACTION_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(cue) for cue in ACTION_CUES) + r")\b", re.IGNORECASE)
+_QUESTION_PATTERN = re.compile(r"^\W*(?:" + "|".join(re.escape(opener) for opener in QUESTION_OPENERS) + r")\b", re.IGNORECASE)
+
+
+def classify_intent(text: str, threshold: float = PREROUTER_THRESHOLD) -> Optional[Intent]:
+    """Returns the delegation a user turn clearly asks for, or None to defer to the LLM router.
+
+    Confidence is the winning intent's share of the total keyword score, so a turn that
+    mentions both a hotel and a car is left to the LLM. Turns without an action cue, and
+    questions ("where is...", "does the hotel..."), are left to the LLM too, however high
+    they score.
+    """
+    if not isinstance(text, str) or any(pattern.search(text) for pattern in _FALLBACK_PATTERNS):
+        return None
+    if _QUESTION_PATTERN.search(text) or not _ACTION_PATTERN.search(text):
+        return None
+    scores = {
+        tool_name: sum(weight for pattern, weight in patterns if pattern.search(text))
+        for tool_name, patterns in _INTENT_PATTERNS.items()
+    }
+    tool_name, best = max(scores.items(), key=lambda item: item[1])
+    total = sum(scores.values())
+    if best < PREROUTER_MIN_SCORE or best / total < threshold:
+        return None
+    # Details the LLM router would extract are left blank; the specialized assistant reads
+    # the full conversation and asks for anything it still needs.
+    args = {field: "" for field in _ROUTING_ARGS[tool_name]}
+    args["request"] = text
+    return Intent(tool_name, best / total, args)
+
+
+# --- Labelled Examples ---
+# User turns and the delegation they should get (None: leave it to the LLM router).
+# Deferring a turn costs one LLM call; misrouting one sends the user to the wrong
+# workflow, so changes to the keywords or the threshold must keep `misrouted` at zero.
+#
+#     python -m assistants.router --threshold 0.8
+ROUTER_EXAMPLES: list[tuple[str, Optional[str]]] = [
+    ("I need to rent a car in Basel", "ToBookCarRental"),
+    ("Can you book me a rental car for next week?", "ToBookCarRental"),
+    ("I'd like a car hire in Zurich from the 3rd to the 7th", "ToBookCarRental"),
+    ("Please cancel my car rental", "ToBookCarRental"),
+    ("Find me a hotel in Basel for two nights", "ToHotelBookingAssistant"),
+    ("I want to book a hotel near the old town", "ToHotelBookingAssistant"),
+    ("Can you reserve accommodation in Lucerne?", "ToHotelBookingAssistant"),
+    ("Please cancel my hotel booking", "ToHotelBookingAssistant"),
+    ("I need to change my flight to an earlier one", "ToFlightBookingAssistant"),
+    ("Can I reschedule to a later flight tomorrow?", "ToFlightBookingAssistant"),
+    ("Please cancel my ticket", "ToFlightBookingAssistant"),
+    ("I want to rebook onto a different flight", "ToFlightBookingAssistant"),
+    ("Recommend some excursions in Basel", "ToBookExcursion"),
+    ("I'm looking for things to do and museums in Zurich", "ToBookExcursion"),
+    ("Can you suggest a tour of the city?", "ToBookExcursion"),
+    ("Is there a hotel shuttle from the airport to my flight?", None),
+    ("Does my hotel have a room with a view?", None),
+    ("Is the car park at the airport open at night?", None),
+    ("What's the hotel check-in time?", None),
+    ("I need a hotel and a rental car in Basel", None),
+    ("Change my flight and book a hotel near the airport", None),
+    ("What is the cancellation policy for my ticket?", None),
+    ("Am I allowed to bring my bike on the flight?", None),
+    ("What are the fees to change my flight?", None),
+    ("Can I get a refund if I cancel my hotel?", None),
+    ("What's the status of my flight?", None),
+    ("What time does my flight leave?", None),
+    ("Hi there!", None),
+    ("Thanks, that's all", None),
+    ("Where is my car?", None),
+    ("Where is the rental car counter in the terminal?", None),
+    ("Do I need a visa to rent a car in Switzerland?", None),
+    ("Does the hotel need my passport at check-in?", None),
+    ("I want to know if the hotel has a gym", None),
+    ("How far is the hotel from the museum?", None),
+    ("I need a car seat for my child on the flight", None),
+]
+
+
+def evaluate_router(examples=ROUTER_EXAMPLES, threshold: float = PREROUTER_THRESHOLD) -> dict:
+    """Classifies every example and counts correct routes, deferrals and misroutes."""
+    results = {"routed": 0, "deferred": 0, "missed": 0, "misrouted": 0, "errors": []}
+    for text, expected in examples:
+        intent = classify_intent(text, threshold)
+        actual = intent.tool_name if intent else None
+        if actual is None:
+            results["deferred" if expected is None else "missed"] += 1
+        elif actual == expected:
+            results["routed"] += 1
+        else:
+            results["misrouted"] += 1
+            results["errors"].append(f"{text!r}: expected {expected}, got {actual}")
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m assistants.router", description="Check the pre-router against labelled examples.")
+    parser.add_argument("--threshold", type=float, default=PREROUTER_THRESHOLD)
+    args = parser.parse_args(argv)
+    results = evaluate_router(threshold=args.threshold)
+    for error in results.pop("errors"):
+        print(f"MISROUTED: {error}")
+    print(", ".join(f"{name}: {count}" for name, count in results.items()))
+    return 1 if results["misrouted"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
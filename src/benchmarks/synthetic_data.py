@@ -0,0 +1,181 @@
+# src/benchmarks/synthetic_data.py
+"""Generates synthetic travel databases with the travel2 schema at configurable sizes.
+
+Scale 1 is roughly the size of travel2.sqlite's flight schedule; every table grows
+linearly with the scale. Missing actual times are written as '\\N', as in travel2.sqlite.
+Output is deterministic for a given scale and seed, and is prepared the same way
+setup_database prepares the real database (epoch-offset time columns and the
+passenger_itinerary table).
+
+    python -m benchmarks.synthetic_data --scale 10 --out ../db/synthetic_x10.sqlite
+"""
+import argparse
+import os
+import random
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+# Rows per unit of scale.
+BASE_SIZES = {
+    "flights": 3000,
+    "passengers": 1000,
+    "hotels": 10,
+    "car_rentals": 10,
+    "trip_recommendations": 10,
+}
+BENCHMARK_PASSENGER_ID = "3442 587242"
+BENCHMARK_PASSENGER_TICKETS = 50
+
+AIRPORTS = ["BSL", "ZRH", "GVA", "CDG", "LHR", "AMS", "FRA", "MUC", "VIE", "FCO", "MAD", "BCN", "LIS", "CPH", "ARN", "OSL", "HEL", "DUB", "BRU", "PRG"]
+CITIES = ["Basel", "Zurich", "Geneva", "Lucerne", "Bern", "Lugano", "Interlaken", "Zermatt", "Paris", "London"]
+HOTEL_CHAINS = ["Hilton", "Marriott", "Hyatt", "Radisson", "Sheraton", "Holiday Inn", "Best Western", "Four Seasons", "Ibis", "Novotel"]
+CAR_COMPANIES = ["Europcar", "Avis", "Hertz", "Sixt", "Budget", "Enterprise", "Thrifty", "Alamo", "National", "Dollar"]
+ATTRACTIONS = ["Art Museum", "Old Town Walk", "Lake Cruise", "Chocolate Tour", "Alpine Hike", "Cathedral Visit", "Wine Tasting", "Glacier Express", "Cable Car Ride", "History Museum"]
+KEYWORDS = ["art", "museum", "history", "nature", "hiking", "food", "wine", "boat", "architecture", "shopping", "mountains", "family"]
+PRICE_TIERS = ["Midscale", "Upper Midscale", "Upscale", "Luxury", "Economy"]
+FARE_CONDITIONS = ["Economy", "Comfort", "Business"]
+
+_SCHEMA = """
+CREATE TABLE flights (
+    flight_id INTEGER PRIMARY KEY, flight_no TEXT, scheduled_departure TEXT, scheduled_arrival TEXT,
+    departure_airport TEXT, arrival_airport TEXT, status TEXT, aircraft_code TEXT,
+    actual_departure TEXT, actual_arrival TEXT
+);
+CREATE TABLE bookings (book_ref TEXT PRIMARY KEY, book_date TEXT, total_amount INTEGER);
+CREATE TABLE tickets (ticket_no TEXT PRIMARY KEY, book_ref TEXT, passenger_id TEXT);
+CREATE TABLE ticket_flights (ticket_no TEXT, flight_id INTEGER, fare_conditions TEXT, amount INTEGER);
+CREATE TABLE boarding_passes (ticket_no TEXT, flight_id INTEGER, boarding_no INTEGER, seat_no TEXT);
+CREATE TABLE hotels (
+    id INTEGER PRIMARY KEY, name TEXT, location TEXT, price_tier TEXT,
+    checkin_date TEXT, checkout_date TEXT, booked INTEGER
+);
+CREATE TABLE car_rentals (
+    id INTEGER PRIMARY KEY, name TEXT, location TEXT, price_tier TEXT,
+    start_date TEXT, end_date TEXT, booked INTEGER
+);
+CREATE TABLE trip_recommendations (
+    id INTEGER PRIMARY KEY, name TEXT, location TEXT, keywords TEXT, details TEXT, booked INTEGER
+);
+"""
+
+# travel2.sqlite marks missing actual times with the string '\N' rather than NULL.
+MISSING = "\\N"
+
+# The dataset's "now": flights before it have departed, flights after it are scheduled.
+ANCHOR = datetime(2024, 4, 30, 12, 0, tzinfo=timezone(timedelta(hours=-4)))
+SCHEDULE_DAYS = 60
+
+
+def _timestamp(value: datetime) -> str:
+    return value.isoformat(sep=" ", timespec="microseconds")
+
+
+def _flights(rng: random.Random, count: int):
+    start = ANCHOR - timedelta(days=SCHEDULE_DAYS // 2)
+    for flight_id in range(1, count + 1):
+        departure_airport, arrival_airport = rng.sample(AIRPORTS, 2)
+        departure = start + timedelta(minutes=rng.randrange(SCHEDULE_DAYS * 24 * 60))
+        arrival = departure + timedelta(minutes=rng.randrange(60, 300))
+        if arrival < ANCHOR:
+            status, actual = "Arrived", (departure + timedelta(minutes=rng.randrange(0, 30)), arrival + timedelta(minutes=rng.randrange(0, 30)))
+        elif departure < ANCHOR:
+            status, actual = "Departed", (departure + timedelta(minutes=rng.randrange(0, 30)), None)
+        else:
+            status, actual = rng.choice(["Scheduled", "Scheduled", "Scheduled", "On Time", "Cancelled"]), (None, None)
+        yield (
+            flight_id, f"LX{rng.randrange(1000, 9999):04d}", _timestamp(departure), _timestamp(arrival),
+            departure_airport, arrival_airport, status, rng.choice(["319", "320", "321", "773", "SU9"]),
+            _timestamp(actual[0]) if actual[0] else MISSING, _timestamp(actual[1]) if actual[1] else MISSING,
+        )
+    # Pin the anchor so the dataset always has a departure exactly at "now".
+    yield (
+        count + 1, "LX0001", _timestamp(ANCHOR), _timestamp(ANCHOR + timedelta(hours=1)),
+        "BSL", "ZRH", "Departed", "320", _timestamp(ANCHOR), MISSING,
+    )
+
+
+def _passenger_rows(rng: random.Random, passengers: int, flight_count: int):
+    """Bookings, tickets, ticket_flights and boarding passes for every passenger."""
+    bookings, tickets, ticket_flights, boarding_passes = [], [], [], []
+    ticket_number = 0
+    passenger_ids = [BENCHMARK_PASSENGER_ID] + [f"{rng.randrange(1000, 9999)} {n:06d}" for n in range(passengers - 1)]
+    for passenger_id in passenger_ids:
+        ticket_count = BENCHMARK_PASSENGER_TICKETS if passenger_id == BENCHMARK_PASSENGER_ID else rng.randrange(1, 4)
+        for _ in range(ticket_count):
+            ticket_number += 1
+            book_ref = f"{ticket_number:06X}"
+            ticket_no = f"{7240005432000000 + ticket_number}"
+            flight_id = rng.randrange(1, flight_count + 1)
+            amount = rng.randrange(5000, 150000, 100)
+            book_date = ANCHOR - timedelta(days=rng.randrange(1, 60), minutes=rng.randrange(1440))
+            bookings.append((book_ref, _timestamp(book_date), amount))
+            tickets.append((ticket_no, book_ref, passenger_id))
+            ticket_flights.append((ticket_no, flight_id, rng.choice(FARE_CONDITIONS), amount))
+            boarding_passes.append((ticket_no, flight_id, rng.randrange(1, 300), f"{rng.randrange(1, 40)}{rng.choice('ABCDEF')}"))
+    return bookings, tickets, ticket_flights, boarding_passes
+
+
+def _hotels(rng: random.Random, count: int):
+    for hotel_id in range(1, count + 1):
+        city, chain = rng.choice(CITIES), rng.choice(HOTEL_CHAINS)
+        checkin = ANCHOR.date() + timedelta(days=rng.randrange(30))
+        yield (hotel_id, f"{chain} {city}", city, rng.choice(PRICE_TIERS), str(checkin), str(checkin + timedelta(days=rng.randrange(1, 8))), 0)
+
+
+def _car_rentals(rng: random.Random, count: int):
+    for rental_id in range(1, count + 1):
+        start = ANCHOR.date() + timedelta(days=rng.randrange(30))
+        yield (rental_id, rng.choice(CAR_COMPANIES), rng.choice(CITIES), rng.choice(PRICE_TIERS), str(start), str(start + timedelta(days=rng.randrange(1, 8))), 0)
+
+
+def _trip_recommendations(rng: random.Random, count: int):
+    for recommendation_id in range(1, count + 1):
+        city, attraction = rng.choice(CITIES), rng.choice(ATTRACTIONS)
+        keywords = ", ".join(rng.sample(KEYWORDS, 3))
+        yield (recommendation_id, f"{city} {attraction}", city, keywords, f"A popular {attraction.lower()} in {city}.", 0)
+
+
+def generate_database(db_path: str, scale: float = 1, seed: int = 0) -> dict:
+    """Writes a synthetic travel database to `db_path` and returns its row counts."""
+    from utils.db_setup import add_time_offsets, build_passenger_itinerary
+    rng = random.Random(seed)
+    sizes = {table: max(1, round(rows * scale)) for table, rows in BASE_SIZES.items()}
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(_SCHEMA)
+        conn.executemany("INSERT INTO flights VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", _flights(rng, sizes["flights"]))
+        bookings, tickets, ticket_flights, boarding_passes = _passenger_rows(rng, sizes["passengers"], sizes["flights"])
+        conn.executemany("INSERT INTO bookings VALUES (?, ?, ?)", bookings)
+        conn.executemany("INSERT INTO tickets VALUES (?, ?, ?)", tickets)
+        conn.executemany("INSERT INTO ticket_flights VALUES (?, ?, ?, ?)", ticket_flights)
+        conn.executemany("INSERT INTO boarding_passes VALUES (?, ?, ?, ?)", boarding_passes)
+        conn.executemany("INSERT INTO hotels VALUES (?, ?, ?, ?, ?, ?, ?)", _hotels(rng, sizes["hotels"]))
+        conn.executemany("INSERT INTO car_rentals VALUES (?, ?, ?, ?, ?, ?, ?)", _car_rentals(rng, sizes["car_rentals"]))
+        conn.executemany("INSERT INTO trip_recommendations VALUES (?, ?, ?, ?, ?, ?)", _trip_recommendations(rng, sizes["trip_recommendations"]))
+        conn.commit()
+        counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ["flights", "tickets", "ticket_flights", "hotels", "car_rentals", "trip_recommendations"]
+        }
+    finally:
+        conn.close()
+    add_time_offsets(db_path)
+    build_passenger_itinerary(db_path)
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.synthetic_data", description="Generate a synthetic travel database.")
+    parser.add_argument("--scale", type=float, default=1, help="Size multiplier; 1 is about the size of travel2.sqlite's schedule.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="Path of the SQLite file to write.")
+    args = parser.parse_args(argv)
+    counts = generate_database(args.out, args.scale, args.seed)
+    print(", ".join(f"{table}: {count}" for table, count in counts.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,190 @@
+# src/benchmarks/tool_benchmark.py
+"""Times every database-backed tool against synthetic databases at several scales.
+
+Each tool is replayed with a fixed set of calls at each scale. The report shows median and
+p95 latency, and how much slower each tool is at a scale than at the smallest one.
+Medians are compared to a saved baseline, and the run fails (exit code 1) when a tool
+regresses past the tolerance.
+
+    python -m benchmarks.tool_benchmark --scales 1,10,100 --update-baseline   # record a baseline
+    python -m benchmarks.tool_benchmark --scales 1,10,100                     # check against it
+
+lookup_policy is not included, because it needs the OpenAI embeddings API; its retriever
+is only set up on first use, so the suite needs no OpenAI key or network access. web_search
+runs against the offline backend.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.synthetic_data import BENCHMARK_PASSENGER_ID, generate_database
+
+_BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(_BENCHMARK_DIR, "baseline.json")
+DEFAULT_SCALES = "1,10,100"
+DEFAULT_REPEATS = 20
+DEFAULT_TOLERANCE = 0.5      # fail when a median is more than 50% slower than the baseline...
+DEFAULT_MIN_DELTA_MS = 1.0   # ...and at least this many milliseconds slower, to ignore timer noise
+
+
+def _context(db_path: str) -> dict:
+    """IDs and values the replayed calls refer to, read from the generated database."""
+    from utils.time_anchor import from_offset
+    conn = sqlite3.connect(db_path)
+    try:
+        future_flights = [
+            row[0] for row in conn.execute(
+                "SELECT flight_id FROM flights WHERE scheduled_departure_offset > ? AND status != 'Cancelled' ORDER BY flight_id LIMIT 2",
+                (int(timedelta(days=2).total_seconds()),),
+            )
+        ]
+        tickets = [row[0] for row in conn.execute("SELECT ticket_no FROM tickets WHERE passenger_id = ? ORDER BY ticket_no", (BENCHMARK_PASSENGER_ID,))]
+    finally:
+        conn.close()
+    now = from_offset(0)
+    return {"future_flights": future_flights, "tickets": tickets, "today": now[:10]}
+
+
+def _cases(ctx: dict) -> list[tuple[str, object, object, bool]]:
+    """(name, tool, args for call i, needs passenger config) for every replayed call."""
+    from tools import car_rental_tools, excursion_tools, flight_tools, hotel_tools, itinerary_tools, web_search_tools
+    today = date.fromisoformat(ctx["today"])
+    week = today + timedelta(days=7)
+    flights, tickets = ctx["future_flights"], ctx["tickets"]
+    return [
+        ("fetch_user_flight_information", flight_tools.fetch_user_flight_information, lambda i: {}, True),
+        ("search_flights[route+window]", flight_tools.search_flights, lambda i: {"departure_airport": "BSL", "arrival_airport": "ZRH", "start_time": today, "end_time": week}, False),
+        ("search_flights[departure+window]", flight_tools.search_flights, lambda i: {"departure_airport": "ZRH", "start_time": today, "end_time": week}, False),
+        ("search_flights[arrival]", flight_tools.search_flights, lambda i: {"arrival_airport": "CDG"}, False),
+        ("search_itineraries", itinerary_tools.search_itineraries, lambda i: {"departure_airport": "BSL", "arrival_airport": "LHR", "start_time": today, "end_time": week}, False),
+        ("update_ticket_to_new_flight", flight_tools.update_ticket_to_new_flight, lambda i: {"ticket_no": tickets[0], "new_flight_id": flights[i % len(flights)]}, True),
+        ("cancel_ticket", flight_tools.cancel_ticket, lambda i: {"ticket_no": tickets[1 + i % (len(tickets) - 4)]}, True),
+        ("cancel_tickets", flight_tools.cancel_tickets, lambda i: {"ticket_nos": tickets[-3:]}, True),
+        ("search_hotels[location]", hotel_tools.search_hotels, lambda i: {"location": "Basel"}, False),
+        ("search_hotels[name+tier]", hotel_tools.search_hotels, lambda i: {"name": "Hilton", "price_tier": "Luxury"}, False),
+        ("book_hotel", hotel_tools.book_hotel, lambda i: {"hotel_id": 1 + i % 3}, False),
+        ("book_hotels", hotel_tools.book_hotels, lambda i: {"hotel_ids": [1, 2, 3]}, False),
+        ("update_hotel", hotel_tools.update_hotel, lambda i: {"hotel_id": 1, "checkin_date": today, "checkout_date": week}, False),
+        ("cancel_hotel", hotel_tools.cancel_hotel, lambda i: {"hotel_id": 1 + i % 3}, False),
+        ("cancel_hotels", hotel_tools.cancel_hotels, lambda i: {"hotel_ids": [1, 2, 3]}, False),
+        ("search_car_rentals[location]", car_rental_tools.search_car_rentals, lambda i: {"location": "Zurich"}, False),
+        ("search_car_rentals[name]", car_rental_tools.search_car_rentals, lambda i: {"name": "Sixt"}, False),
+        ("book_car_rental", car_rental_tools.book_car_rental, lambda i: {"rental_id": 1 + i % 3}, False),
+        ("book_car_rentals", car_rental_tools.book_car_rentals, lambda i: {"rental_ids": [1, 2, 3]}, False),
+        ("update_car_rental", car_rental_tools.update_car_rental, lambda i: {"rental_id": 1, "start_date": today, "end_date": week}, False),
+        ("cancel_car_rental", car_rental_tools.cancel_car_rental, lambda i: {"rental_id": 1 + i % 3}, False),
+        ("cancel_car_rentals", car_rental_tools.cancel_car_rentals, lambda i: {"rental_ids": [1, 2, 3]}, False),
+        ("search_trip_recommendations[location]", excursion_tools.search_trip_recommendations, lambda i: {"location": "Lucerne"}, False),
+        ("search_trip_recommendations[keywords]", excursion_tools.search_trip_recommendations, lambda i: {"keywords": "art, museum, wine"}, False),
+        ("book_excursion", excursion_tools.book_excursion, lambda i: {"recommendation_id": 1 + i % 3}, False),
+        ("book_excursions", excursion_tools.book_excursions, lambda i: {"recommendation_ids": [1, 2, 3]}, False),
+        ("update_excursion", excursion_tools.update_excursion, lambda i: {"recommendation_id": 1, "details": f"Updated details {i}."}, False),
+        ("cancel_excursion", excursion_tools.cancel_excursion, lambda i: {"recommendation_id": 1 + i % 3}, False),
+        ("cancel_excursions", excursion_tools.cancel_excursions, lambda i: {"recommendation_ids": [1, 2, 3]}, False),
+        ("web_search[offline]", web_search_tools.web_search, lambda i: {"query": f"Basel weather {i % 3}"}, False),
+    ]
+
+
+def _use_database(db_path: str) -> None:
+    """Points every tool module at `db_path` and pins the time anchor to its dataset."""
+    from tools import car_rental_tools, excursion_tools, flight_tools, hotel_tools, itinerary_tools
+    from utils.db_setup import read_dataset_time
+    from utils.time_anchor import set_epoch_anchor
+    for module in (car_rental_tools, excursion_tools, flight_tools, hotel_tools, itinerary_tools):
+        module.DB_PATH = db_path
+    set_epoch_anchor(read_dataset_time(db_path)["utc_offset_seconds"])
+
+
+def run_scale(db_path: str, repeats: int) -> dict[str, dict]:
+    """Replays every case `repeats` times (after one warm-up call) and returns latency stats in ms."""
+    from tools.web_search_tools import OfflineBackend, set_web_search_backend
+    _use_database(db_path)
+    set_web_search_backend(OfflineBackend())
+    config = {"configurable": {"passenger_id": BENCHMARK_PASSENGER_ID}}
+    results = {}
+    for name, tool, args, needs_config in _cases(_context(db_path)):
+        tool.invoke(args(0), config=config if needs_config else None)
+        timings = []
+        for i in range(repeats):
+            start = time.perf_counter()
+            tool.invoke(args(i), config=config if needs_config else None)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results[name] = {
+            "median_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        }
+    return results
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list[str]:
+    regressions = []
+    for scale, cases in results.items():
+        for name, stats in cases.items():
+            reference = baseline.get(scale, {}).get(name)
+            if reference is None:
+                continue
+            if stats["median_ms"] > reference * (1 + tolerance) and stats["median_ms"] - reference > min_delta_ms:
+                regressions.append(f"{name} at scale {scale}: {stats['median_ms']} ms vs baseline {reference} ms")
+    return regressions
+
+
+def _print_report(results: dict) -> None:
+    scales = list(results)
+    smallest = results[scales[0]]
+    print(f"{'tool':42}" + "".join(f"{'x' + s + ' median/p95 (ms)':>28}" for s in scales))
+    for name in smallest:
+        row = f"{name:42}"
+        for scale in scales:
+            stats = results[scale][name]
+            growth = stats["median_ms"] / smallest[name]["median_ms"] if smallest[name]["median_ms"] else 0
+            row += f"{stats['median_ms']:>12.3f}/{stats['p95_ms']:<8.3f} x{growth:<5.1f}"
+        print(row)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.tool_benchmark", description="Benchmark the tools against synthetic data.")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="Comma-separated scale factors.")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="Where to keep generated databases (default: a temporary directory).")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Save this run's medians as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    args = parser.parse_args(argv)
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="tool-benchmark-")
+    os.makedirs(data_dir, exist_ok=True)
+    results = {}
+    for scale in args.scales.split(","):
+        db_path = os.path.join(data_dir, f"synthetic_x{scale}_seed{args.seed}.sqlite")
+        # Write benchmarks change the data, so every run starts from a freshly generated database.
+        generate_database(db_path, float(scale), args.seed)
+        results[scale] = run_scale(db_path, args.repeats)
+    _print_report(results)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({scale: {name: stats["median_ms"] for name, stats in cases.items()} for scale, cases in results.items()}, f, indent=2)
+        print(f"Baseline written to {args.baseline}.")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results, baseline, args.tolerance, args.min_delta_ms)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 # src/tools/__init__.py
 from .flight_tools import *
+from .itinerary_tools import *
 from .hotel_tools import *
 from .car_rental_tools import *
 from .excursion_tools import *
-from .policy_tools import *
\ No newline at end of file
+from .policy_tools import *
+from .web_search_tools import *
\ No newline at end of file
@@ -1,9 +1,9 @@
 # src/tools/car_rental_tools.py
-import sqlite3
 import os
 from datetime import date, datetime
 from typing import Optional, Union
 from langchain_core.tools import tool
+from utils.db_connection import connect_readonly, write_transaction
 
 _CURRENT_DIR = os.path.dirname(os.path.abspath(__file__)) # .../src/tools
 _SRC_DIR = os.path.dirname(_CURRENT_DIR)                 # .../src
@@ -20,7 +20,7 @@ def search_car_rentals(
     end_date: Optional[Union[datetime, date]] = None,
 ) -> list[dict]:
     """Search for car rentals based on location, name, price tier, start date, and end date."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_readonly(DB_PATH)
     cursor = conn.cursor()
     query = "SELECT * FROM car_rentals WHERE 1=1"
     params = []
@@ -35,19 +35,32 @@ def search_car_rentals(
     conn.close()
     return [dict(zip([column[0] for column in cursor.description], row)) for row in results]
 
+def _set_booked(rental_ids: list[int], booked: int) -> list[int]:
+    """Sets the booked flag for all given car rentals in one statement and returns the IDs that matched."""
+    placeholders = ", ".join("?" for _ in rental_ids)
+    with write_transaction(DB_PATH) as conn:
+        rows = conn.execute(
+            f"UPDATE car_rentals SET booked = ? WHERE id IN ({placeholders}) RETURNING id",
+            (booked, *rental_ids),
+        ).fetchall()
+    return [row[0] for row in rows]
+
 @tool
 def book_car_rental(rental_id: int) -> str:
     """Book a car rental by its ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE car_rentals SET booked = 1 WHERE id = ?", (rental_id,))
-    conn.commit()
-    if cursor.rowcount > 0:
-        conn.close()
+    if _set_booked([rental_id], 1):
         return f"Car rental {rental_id} successfully booked."
-    else:
-        conn.close()
-        return f"No car rental found with ID {rental_id}."
+    return f"No car rental found with ID {rental_id}."
+
+@tool
+def book_car_rentals(rental_ids: list[int]) -> str:
+    """Book several car rentals at once by their IDs."""
+    booked = _set_booked(rental_ids, 1)
+    missing = [rental_id for rental_id in rental_ids if rental_id not in booked]
+    message = f"Car rentals {booked} successfully booked." if booked else "No car rentals were booked."
+    if missing:
+        message += f" No car rental found with IDs {missing}."
+    return message
 
 @tool
 def update_car_rental(
@@ -56,30 +69,31 @@ def update_car_rental(
     end_date: Optional[Union[datetime, date]] = None,
 ) -> str:
     """Update a car rental's start and end dates by its ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    if start_date:
-        cursor.execute("UPDATE car_rentals SET start_date = ? WHERE id = ?", (start_date, rental_id))
-    if end_date:
-        cursor.execute("UPDATE car_rentals SET end_date = ? WHERE id = ?", (end_date, rental_id))
-    conn.commit()
-    if cursor.rowcount > 0:
-        conn.close()
+    if start_date is None and end_date is None:
+        return f"Nothing to update for car rental {rental_id}: provide a start date, an end date, or both."
+    with write_transaction(DB_PATH) as conn:
+        updated = conn.execute(
+            "UPDATE car_rentals SET start_date = COALESCE(?, start_date), end_date = COALESCE(?, end_date) "
+            "WHERE id = ? RETURNING id",
+            (start_date, end_date, rental_id),
+        ).fetchone()
+    if updated:
         return f"Car rental {rental_id} successfully updated."
-    else:
-        conn.close()
-        return f"No car rental found with ID {rental_id}."
+    return f"No car rental found with ID {rental_id}."
 
 @tool
 def cancel_car_rental(rental_id: int) -> str:
     """Cancel a car rental by its ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE car_rentals SET booked = 0 WHERE id = ?", (rental_id,))
-    conn.commit()
-    if cursor.rowcount > 0:
-        conn.close()
+    if _set_booked([rental_id], 0):
         return f"Car rental {rental_id} successfully cancelled."
-    else:
-        conn.close()
-        return f"No car rental found with ID {rental_id}."
\ No newline at end of file
+    return f"No car rental found with ID {rental_id}."
+
+@tool
+def cancel_car_rentals(rental_ids: list[int]) -> str:
+    """Cancel several car rentals at once by their IDs."""
+    cancelled = _set_booked(rental_ids, 0)
+    missing = [rental_id for rental_id in rental_ids if rental_id not in cancelled]
+    message = f"Car rentals {cancelled} successfully cancelled." if cancelled else "No car rentals were cancelled."
+    if missing:
+        message += f" No car rental found with IDs {missing}."
+    return message
@@ -1,8 +1,8 @@
 # src/tools/excursion_tools.py
-import sqlite3
 import os
 from typing import Optional
 from langchain_core.tools import tool
+from utils.db_connection import connect_readonly, write_transaction
 
 _CURRENT_DIR = os.path.dirname(os.path.abspath(__file__)) # .../src/tools
 _SRC_DIR = os.path.dirname(_CURRENT_DIR)                 # .../src
@@ -17,7 +17,7 @@ def search_trip_recommendations(
     keywords: Optional[str] = None,
 ) -> list[dict]:
     """Search for trip recommendations based on location, name, and keywords."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_readonly(DB_PATH)
     cursor = conn.cursor()
     query = "SELECT * FROM trip_recommendations WHERE 1=1"
     params = []
@@ -37,44 +37,58 @@ def search_trip_recommendations(
     conn.close()
     return [dict(zip([column[0] for column in cursor.description], row)) for row in results]
 
+def _set_booked(recommendation_ids: list[int], booked: int) -> list[int]:
+    """Sets the booked flag for all given trip recommendations in one statement and returns the IDs that matched."""
+    placeholders = ", ".join("?" for _ in recommendation_ids)
+    with write_transaction(DB_PATH) as conn:
+        rows = conn.execute(
+            f"UPDATE trip_recommendations SET booked = ? WHERE id IN ({placeholders}) RETURNING id",
+            (booked, *recommendation_ids),
+        ).fetchall()
+    return [row[0] for row in rows]
+
 @tool
 def book_excursion(recommendation_id: int) -> str:
     """Book an excursion by its recommendation ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE trip_recommendations SET booked = 1 WHERE id = ?", (recommendation_id,))
-    conn.commit()
-    if cursor.rowcount > 0:
-        conn.close()
+    if _set_booked([recommendation_id], 1):
         return f"Trip recommendation {recommendation_id} successfully booked."
-    else:
-        conn.close()
-        return f"No trip recommendation found with ID {recommendation_id}."
+    return f"No trip recommendation found with ID {recommendation_id}."
+
+@tool
+def book_excursions(recommendation_ids: list[int]) -> str:
+    """Book several excursions at once by their recommendation IDs."""
+    booked = _set_booked(recommendation_ids, 1)
+    missing = [rec_id for rec_id in recommendation_ids if rec_id not in booked]
+    message = f"Trip recommendations {booked} successfully booked." if booked else "No trip recommendations were booked."
+    if missing:
+        message += f" No trip recommendation found with IDs {missing}."
+    return message
 
 @tool
 def update_excursion(recommendation_id: int, details: str) -> str:
     """Update a trip recommendation's details by its ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE trip_recommendations SET details = ? WHERE id = ?", (details, recommendation_id))
-    conn.commit()
-    if cursor.rowcount > 0:
-        conn.close()
+    with write_transaction(DB_PATH) as conn:
+        updated = conn.execute(
+            "UPDATE trip_recommendations SET details = ? WHERE id = ? RETURNING id",
+            (details, recommendation_id),
+        ).fetchone()
+    if updated:
         return f"Trip recommendation {recommendation_id} successfully updated."
-    else:
-        conn.close()
-        return f"No trip recommendation found with ID {recommendation_id}."
+    return f"No trip recommendation found with ID {recommendation_id}."
 
 @tool
 def cancel_excursion(recommendation_id: int) -> str:
     """Cancel a trip recommendation by its ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE trip_recommendations SET booked = 0 WHERE id = ?", (recommendation_id,))
-    conn.commit()
-    if cursor.rowcount > 0:
-        conn.close()
+    if _set_booked([recommendation_id], 0):
         return f"Trip recommendation {recommendation_id} successfully cancelled."
-    else:
-        conn.close()
-        return f"No trip recommendation found with ID {recommendation_id}."
\ No newline at end of file
+    return f"No trip recommendation found with ID {recommendation_id}."
+
+@tool
+def cancel_excursions(recommendation_ids: list[int]) -> str:
+    """Cancel several excursions at once by their recommendation IDs."""
+    cancelled = _set_booked(recommendation_ids, 0)
+    missing = [rec_id for rec_id in recommendation_ids if rec_id not in cancelled]
+    message = f"Trip recommendations {cancelled} successfully cancelled." if cancelled else "No trip recommendations were cancelled."
+    if missing:
+        message += f" No trip recommendation found with IDs {missing}."
+    return message
@@ -1,10 +1,13 @@
-import sqlite3
 import os
+import sqlite3
+import time
 from datetime import date, datetime
 from typing import Optional
-import pytz
 from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
+from utils.db_connection import connect_readonly, write_transaction
+from utils.db_setup import ITINERARY_JOIN
+from utils.time_anchor import epoch_anchor, format_row_times, from_offset, to_offset
 
 # --- CORRECTED Path Correction for Fallback ---
 _CURRENT_DIR = os.path.dirname(os.path.abspath(__file__)) # .../src/tools
@@ -13,6 +16,10 @@ _PROJECT_ROOT = os.path.dirname(_SRC_DIR)                # .../
 _DEFAULT_DB_PATH = os.path.join(_PROJECT_ROOT, "db", "travel2.sqlite")
 DB_PATH = os.getenv("DB_PATH", _DEFAULT_DB_PATH)
 
+_ITINERARY_FIELDS = """
+    ticket_no, book_ref, flight_id, flight_no, departure_airport, arrival_airport,
+    scheduled_departure, scheduled_arrival, seat_no, fare_conditions
+"""
 
 @tool
 def fetch_user_flight_information(config: RunnableConfig) -> list[dict]:
@@ -22,29 +29,28 @@ def fetch_user_flight_information(config: RunnableConfig) -> list[dict]:
     if not passenger_id:
         raise ValueError("No passenger ID configured.")
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_readonly(DB_PATH)
     cursor = conn.cursor()
-    query = """
-    SELECT 
-        t.ticket_no, t.book_ref,
-        f.flight_id, f.flight_no, f.departure_airport, f.arrival_airport, f.scheduled_departure, f.scheduled_arrival,
-        bp.seat_no, tf.fare_conditions
-    FROM 
-        tickets t
-        JOIN ticket_flights tf ON t.ticket_no = tf.ticket_no
-        JOIN flights f ON tf.flight_id = f.flight_id
-        JOIN boarding_passes bp ON bp.ticket_no = t.ticket_no AND bp.flight_id = f.flight_id
-    WHERE 
-        t.passenger_id = ?
-    """
-    cursor.execute(query, (passenger_id,))
+    try:
+        # Single indexed read from the view maintained by utils.db_setup.build_passenger_itinerary.
+        cursor.execute(f"SELECT {_ITINERARY_FIELDS} FROM passenger_itinerary WHERE passenger_id = ?", (passenger_id,))
+    except sqlite3.OperationalError:
+        # Databases that were not prepared by setup_database fall back to the live join.
+        cursor.execute(f"SELECT {_ITINERARY_FIELDS} FROM ({ITINERARY_JOIN}) WHERE passenger_id = ?", (passenger_id,))
     rows = cursor.fetchall()
     column_names = [column[0] for column in cursor.description]
-    results = [dict(zip(column_names, row)) for row in rows]
+    results = [format_row_times(dict(zip(column_names, row))) for row in rows]
     cursor.close()
     conn.close()
     return results
 
+_FLIGHT_SELECT = """
+    flight_id, flight_no,
+    scheduled_departure_offset AS scheduled_departure, scheduled_arrival_offset AS scheduled_arrival,
+    departure_airport, arrival_airport, status, aircraft_code,
+    actual_departure_offset AS actual_departure, actual_arrival_offset AS actual_arrival
+"""
+
 @tool
 def search_flights(
     departure_airport: Optional[str] = None,
@@ -54,9 +60,9 @@ def search_flights(
     limit: int = 20,
 ) -> list[dict]:
     """Search for flights based on departure airport, arrival airport, and departure time range."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_readonly(DB_PATH)
     cursor = conn.cursor()
-    query = "SELECT * FROM flights WHERE 1 = 1"
+    query = f"SELECT {_FLIGHT_SELECT} FROM flights WHERE 1 = 1"
     params = []
     if departure_airport:
         query += " AND departure_airport = ?"
@@ -65,21 +71,29 @@ def search_flights(
         query += " AND arrival_airport = ?"
         params.append(arrival_airport)
     if start_time:
-        query += " AND scheduled_departure >= ?"
-        params.append(str(start_time))
+        query += " AND scheduled_departure_offset >= ?"
+        params.append(to_offset(start_time))
     if end_time:
-        query += " AND scheduled_departure <= ?"
-        params.append(str(end_time))
+        query += " AND scheduled_departure_offset <= ?"
+        params.append(to_offset(end_time))
     query += " LIMIT ?"
     params.append(limit)
     cursor.execute(query, params)
     rows = cursor.fetchall()
     column_names = [column[0] for column in cursor.description]
-    results = [dict(zip(column_names, row)) for row in rows]
+    results = [format_row_times(dict(zip(column_names, row))) for row in rows]
     cursor.close()
     conn.close()
     return results
 
+_OWNED_TICKET_CONDITION = "ticket_no = ? AND EXISTS (SELECT 1 FROM tickets WHERE tickets.ticket_no = ? AND tickets.passenger_id = ?)"
+
+def _ticket_not_found_message(conn, ticket_no: str, passenger_id: str) -> str:
+    """Explains why an ownership-checked mutation matched no rows. Only runs on the failure path."""
+    if not conn.execute("SELECT 1 FROM ticket_flights WHERE ticket_no = ?", (ticket_no,)).fetchone():
+        return "No existing ticket found for the given ticket number."
+    return f"Current signed-in passenger with ID {passenger_id} not the owner of ticket {ticket_no}"
+
 @tool
 def update_ticket_to_new_flight(ticket_no: str, new_flight_id: int, *, config: RunnableConfig) -> str:
     """Update the user's ticket to a new valid flight."""
@@ -87,38 +101,19 @@ def update_ticket_to_new_flight(ticket_no: str, new_flight_id: int, *, config: R
     passenger_id = configuration.get("passenger_id", None)
     if not passenger_id:
         raise ValueError("No passenger ID configured.")
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT departure_airport, arrival_airport, scheduled_departure FROM flights WHERE flight_id = ?", (new_flight_id,))
-    new_flight = cursor.fetchone()
-    if not new_flight:
-        cursor.close()
-        conn.close()
-        return "Invalid new flight ID provided."
-    column_names = [column[0] for column in cursor.description]
-    new_flight_dict = dict(zip(column_names, new_flight))
-    timezone = pytz.timezone("Etc/GMT-3")
-    current_time = datetime.now(tz=timezone)
-    departure_time = datetime.strptime(new_flight_dict["scheduled_departure"], "%Y-%m-%d %H:%M:%S.%f%z")
-    time_until = (departure_time - current_time).total_seconds()
-    if time_until < (3 * 3600):
-        return f"Not permitted to reschedule to a flight that is less than 3 hours from the current time. Selected flight is at {departure_time}."
-    cursor.execute("SELECT flight_id FROM ticket_flights WHERE ticket_no = ?", (ticket_no,))
-    current_flight = cursor.fetchone()
-    if not current_flight:
-        cursor.close()
-        conn.close()
-        return "No existing ticket found for the given ticket number."
-    cursor.execute("SELECT * FROM tickets WHERE ticket_no = ? AND passenger_id = ?", (ticket_no, passenger_id))
-    current_ticket = cursor.fetchone()
-    if not current_ticket:
-        cursor.close()
-        conn.close()
-        return f"Current signed-in passenger with ID {passenger_id} not the owner of ticket {ticket_no}"
-    cursor.execute("UPDATE ticket_flights SET flight_id = ? WHERE ticket_no = ?", (new_flight_id, ticket_no))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with write_transaction(DB_PATH) as conn:
+        new_flight = conn.execute("SELECT scheduled_departure_offset FROM flights WHERE flight_id = ?", (new_flight_id,)).fetchone()
+        if not new_flight:
+            return "Invalid new flight ID provided."
+        time_until = epoch_anchor() + new_flight[0] - time.time()
+        if time_until < (3 * 3600):
+            return f"Not permitted to reschedule to a flight that is less than 3 hours from the current time. Selected flight is at {from_offset(new_flight[0])}."
+        updated = conn.execute(
+            f"UPDATE ticket_flights SET flight_id = ? WHERE {_OWNED_TICKET_CONDITION} RETURNING ticket_no",
+            (new_flight_id, ticket_no, ticket_no, passenger_id),
+        ).fetchall()
+        if not updated:
+            return _ticket_not_found_message(conn, ticket_no, passenger_id)
     return "Ticket successfully updated to new flight."
 
 @tool
@@ -128,22 +123,34 @@ def cancel_ticket(ticket_no: str, *, config: RunnableConfig) -> str:
     passenger_id = configuration.get("passenger_id", None)
     if not passenger_id:
         raise ValueError("No passenger ID configured.")
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT flight_id FROM ticket_flights WHERE ticket_no = ?", (ticket_no,))
-    existing_ticket = cursor.fetchone()
-    if not existing_ticket:
-        cursor.close()
-        conn.close()
-        return "No existing ticket found for the given ticket number."
-    cursor.execute("SELECT ticket_no FROM tickets WHERE ticket_no = ? AND passenger_id = ?", (ticket_no, passenger_id))
-    current_ticket = cursor.fetchone()
-    if not current_ticket:
-        cursor.close()
-        conn.close()
-        return f"Current signed-in passenger with ID {passenger_id} not the owner of ticket {ticket_no}"
-    cursor.execute("DELETE FROM ticket_flights WHERE ticket_no = ?", (ticket_no,))
-    conn.commit()
-    cursor.close()
-    conn.close()
-    return "Ticket successfully cancelled."
\ No newline at end of file
+    with write_transaction(DB_PATH) as conn:
+        deleted = conn.execute(
+            f"DELETE FROM ticket_flights WHERE {_OWNED_TICKET_CONDITION} RETURNING ticket_no",
+            (ticket_no, ticket_no, passenger_id),
+        ).fetchall()
+        if not deleted:
+            return _ticket_not_found_message(conn, ticket_no, passenger_id)
+    return "Ticket successfully cancelled."
+
+@tool
+def cancel_tickets(ticket_nos: list[str], *, config: RunnableConfig) -> str:
+    """Cancel several of the user's tickets at once and remove them from the database."""
+    configuration = config.get("configurable", {})
+    passenger_id = configuration.get("passenger_id", None)
+    if not passenger_id:
+        raise ValueError("No passenger ID configured.")
+    placeholders = ", ".join("?" for _ in ticket_nos)
+    with write_transaction(DB_PATH) as conn:
+        rows = conn.execute(
+            f"DELETE FROM ticket_flights WHERE ticket_no IN ({placeholders}) "
+            f"AND ticket_no IN (SELECT ticket_no FROM tickets WHERE passenger_id = ?) RETURNING ticket_no",
+            (*ticket_nos, passenger_id),
+        ).fetchall()
+        cancelled = {row[0] for row in rows}
+        failures = [
+            f"{ticket_no}: {_ticket_not_found_message(conn, ticket_no, passenger_id)}"
+            for ticket_no in ticket_nos
+            if ticket_no not in cancelled
+        ]
+    message = f"Tickets {sorted(cancelled)} successfully cancelled." if cancelled else "No tickets were cancelled."
+    return " ".join([message, *failures])
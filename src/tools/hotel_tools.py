@@ -1,9 +1,9 @@
 # src/tools/hotel_tools.py
-import sqlite3
 import os
 from datetime import date, datetime
 from typing import Optional, Union
 from langchain_core.tools import tool
+from utils.db_connection import connect_readonly, write_transaction
 
 _CURRENT_DIR = os.path.dirname(os.path.abspath(__file__)) # .../src/tools
 _SRC_DIR = os.path.dirname(_CURRENT_DIR)                 # .../src
@@ -20,7 +20,7 @@ def search_hotels(
     checkout_date: Optional[Union[datetime, date]] = None,
 ) -> list[dict]:
     """Search for hotels based on location, name, price tier, check-in date, and check-out date."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_readonly(DB_PATH)
     cursor = conn.cursor()
     query = "SELECT * FROM hotels WHERE 1=1"
     params = []
@@ -35,19 +35,32 @@ def search_hotels(
     conn.close()
     return [dict(zip([column[0] for column in cursor.description], row)) for row in results]
 
+def _set_booked(hotel_ids: list[int], booked: int) -> list[int]:
+    """Sets the booked flag for all given hotels in one statement and returns the IDs that matched."""
+    placeholders = ", ".join("?" for _ in hotel_ids)
+    with write_transaction(DB_PATH) as conn:
+        rows = conn.execute(
+            f"UPDATE hotels SET booked = ? WHERE id IN ({placeholders}) RETURNING id",
+            (booked, *hotel_ids),
+        ).fetchall()
+    return [row[0] for row in rows]
+
 @tool
 def book_hotel(hotel_id: int) -> str:
     """Book a hotel by its ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE hotels SET booked = 1 WHERE id = ?", (hotel_id,))
-    conn.commit()
-    if cursor.rowcount > 0:
-        conn.close()
+    if _set_booked([hotel_id], 1):
         return f"Hotel {hotel_id} successfully booked."
-    else:
-        conn.close()
-        return f"No hotel found with ID {hotel_id}."
+    return f"No hotel found with ID {hotel_id}."
+
+@tool
+def book_hotels(hotel_ids: list[int]) -> str:
+    """Book several hotels at once by their IDs."""
+    booked = _set_booked(hotel_ids, 1)
+    missing = [hotel_id for hotel_id in hotel_ids if hotel_id not in booked]
+    message = f"Hotels {booked} successfully booked." if booked else "No hotels were booked."
+    if missing:
+        message += f" No hotel found with IDs {missing}."
+    return message
 
 @tool
 def update_hotel(
@@ -56,30 +69,31 @@ def update_hotel(
     checkout_date: Optional[Union[datetime, date]] = None,
 ) -> str:
     """Update a hotel's check-in and check-out dates by its ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    if checkin_date:
-        cursor.execute("UPDATE hotels SET checkin_date = ? WHERE id = ?", (checkin_date, hotel_id))
-    if checkout_date:
-        cursor.execute("UPDATE hotels SET checkout_date = ? WHERE id = ?", (checkout_date, hotel_id))
-    conn.commit()
-    if cursor.rowcount > 0:
-        conn.close()
+    if checkin_date is None and checkout_date is None:
+        return f"Nothing to update for hotel {hotel_id}: provide a check-in date, a check-out date, or both."
+    with write_transaction(DB_PATH) as conn:
+        updated = conn.execute(
+            "UPDATE hotels SET checkin_date = COALESCE(?, checkin_date), checkout_date = COALESCE(?, checkout_date) "
+            "WHERE id = ? RETURNING id",
+            (checkin_date, checkout_date, hotel_id),
+        ).fetchone()
+    if updated:
         return f"Hotel {hotel_id} successfully updated."
-    else:
-        conn.close()
-        return f"No hotel found with ID {hotel_id}."
+    return f"No hotel found with ID {hotel_id}."
 
 @tool
 def cancel_hotel(hotel_id: int) -> str:
     """Cancel a hotel by its ID."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE hotels SET booked = 0 WHERE id = ?", (hotel_id,))
-    conn.commit()
-    if cursor.rowcount > 0:
-        conn.close()
+    if _set_booked([hotel_id], 0):
         return f"Hotel {hotel_id} successfully cancelled."
-    else:
-        conn.close()
-        return f"No hotel found with ID {hotel_id}."
\ No newline at end of file
+    return f"No hotel found with ID {hotel_id}."
+
+@tool
+def cancel_hotels(hotel_ids: list[int]) -> str:
+    """Cancel several hotels at once by their IDs."""
+    cancelled = _set_booked(hotel_ids, 0)
+    missing = [hotel_id for hotel_id in hotel_ids if hotel_id not in cancelled]
+    message = f"Hotels {cancelled} successfully cancelled." if cancelled else "No hotels were cancelled."
+    if missing:
+        message += f" No hotel found with IDs {missing}."
+    return message
@@ -0,0 +1,269 @@
+# src/tools/itinerary_tools.py
+import bisect
+import heapq
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import date, datetime, timedelta
+from typing import Optional
+from langchain_core.tools import tool
+from utils.db_connection import connect_readonly_versioned, primary_version
+from utils.time_anchor import epoch_anchor, format_row_times, from_offset, to_offset
+
+_CURRENT_DIR = os.path.dirname(os.path.abspath(__file__)) # .../src/tools
+_SRC_DIR = os.path.dirname(_CURRENT_DIR)                 # .../src
+_PROJECT_ROOT = os.path.dirname(_SRC_DIR)                # .../
+_DEFAULT_DB_PATH = os.path.join(_PROJECT_ROOT, "db", "travel2.sqlite")
+DB_PATH = os.getenv("DB_PATH", _DEFAULT_DB_PATH)
+
+_FLIGHT_COLUMNS = ["flight_id", "flight_no", "departure_airport", "arrival_airport", "scheduled_departure", "scheduled_arrival", "status"]
+_FLIGHT_SELECT = ", ".join(
+    f"{column}_offset AS {column}" if column.startswith("scheduled_") else column for column in _FLIGHT_COLUMNS
+)
+
+# --- Search Bounds ---
+DEFAULT_SEARCH_WINDOW = timedelta(days=3)  # first-leg window when start_time/end_time are omitted
+MAX_CONNECTIONS_PER_HUB = 20               # connecting flights tried at each hub, earliest first
+
+
+class RouteIndex:
+    """An in-memory, time-indexed graph of scheduled flights keyed by departure airport.
+
+    For every airport, departures are kept sorted by timestamp so the flights leaving within
+    a connection window are found with a binary search. The index watches the database file
+    and, when it changes, loads only the newly added flights if the table was appended to,
+    or rebuilds from scratch if rows were removed. Writes that leave the flights table's
+    row count and highest ID untouched (bookings, ticket changes) keep the index as is;
+    call `invalidate` after editing existing schedules in place.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._file_version = None
+        self._row_count = 0
+        self._max_flight_id = None
+        # airport -> (sorted departure offsets, flights in the same order). Each entry is
+        # replaced as a whole, never mutated, so lock-free readers see a consistent pair.
+        self._schedule: dict[str, tuple[list[int], list[dict]]] = {}
+        # arrival airport -> airports with a flight to it
+        self._inbound: dict[str, frozenset[str]] = {}
+
+    def refresh(self) -> None:
+        """Brings the index up to date with the flights table if the database has changed.
+
+        The index records the version of the data it actually read, which can be an older
+        snapshot than the primary; it then catches up on a later call, once the newer
+        snapshot is built.
+        """
+        if primary_version(self.db_path) == self._file_version:
+            return
+        with self._lock:
+            if primary_version(self.db_path) == self._file_version:
+                return
+            conn, file_version = connect_readonly_versioned(self.db_path)
+            if file_version == self._file_version:
+                conn.close()
+                return
+            try:
+                row_count, max_flight_id = conn.execute("SELECT COUNT(*), MAX(flight_id) FROM flights").fetchone()
+                appended_only = (
+                    self._file_version is not None
+                    and self._max_flight_id is not None
+                    and max_flight_id is not None
+                    and max_flight_id > self._max_flight_id
+                )
+                if appended_only:
+                    new_rows = conn.execute(
+                        f"SELECT {_FLIGHT_SELECT} FROM flights WHERE flight_id > ?", (self._max_flight_id,)
+                    ).fetchall()
+                    appended_only = self._row_count + len(new_rows) == row_count
+                if appended_only:
+                    for row in new_rows:
+                        self._insert(dict(zip(_FLIGHT_COLUMNS, row)))
+                elif (row_count, max_flight_id) != (self._row_count, self._max_flight_id) or self._file_version is None:
+                    self._rebuild(conn)
+            finally:
+                conn.close()
+            self._row_count = row_count
+            self._max_flight_id = max_flight_id
+            self._file_version = file_version
+
+    def invalidate(self) -> None:
+        """Forces a full rebuild on the next refresh."""
+        with self._lock:
+            self._file_version = None
+
+    def _rebuild(self, conn) -> None:
+        flights_by_airport, inbound = defaultdict(list), defaultdict(set)
+        rows = conn.execute(f"SELECT {_FLIGHT_SELECT} FROM flights").fetchall()
+        for row in rows:
+            flight = self._prepare(dict(zip(_FLIGHT_COLUMNS, row)))
+            if flight:
+                flights_by_airport[flight["departure_airport"]].append(flight)
+                inbound[flight["arrival_airport"]].add(flight["departure_airport"])
+        schedule = {}
+        for airport, flights in flights_by_airport.items():
+            flights.sort(key=lambda flight: flight["_departure_ts"])
+            schedule[airport] = ([flight["_departure_ts"] for flight in flights], flights)
+        # Swap in the finished index so concurrent searches never see a partial rebuild.
+        self._schedule = schedule
+        self._inbound = {airport: frozenset(origins) for airport, origins in inbound.items()}
+
+    def _prepare(self, flight: dict) -> Optional[dict]:
+        """Adds sort keys (stored offsets) to a flight row, or returns None if it can't be flown."""
+        if flight["status"] == "Cancelled" or flight["scheduled_departure"] is None or flight["scheduled_arrival"] is None:
+            return None
+        flight["_departure_ts"] = flight["scheduled_departure"]
+        flight["_arrival_ts"] = flight["scheduled_arrival"]
+        return flight
+
+    def _insert(self, flight: dict) -> None:
+        flight = self._prepare(flight)
+        if not flight:
+            return
+        airport = flight["departure_airport"]
+        times, flights = self._schedule.get(airport, ([], []))
+        position = bisect.bisect_right(times, flight["_departure_ts"])
+        self._schedule[airport] = (
+            times[:position] + [flight["_departure_ts"]] + times[position:],
+            flights[:position] + [flight] + flights[position:],
+        )
+        origins = self._inbound.get(flight["arrival_airport"], frozenset())
+        if airport not in origins:
+            self._inbound[flight["arrival_airport"]] = origins | {airport}
+
+    def departures(self, airport: str, earliest: float, latest: float) -> list[dict]:
+        """Returns flights leaving `airport` between two timestamps, in departure order."""
+        times, flights = self._schedule.get(airport, ([], []))
+        start = bisect.bisect_left(times, earliest)
+        end = bisect.bisect_right(times, latest)
+        return flights[start:end]
+
+    def legs_to(self, destination: str, max_legs: int) -> dict[str, int]:
+        """Fewest legs from each airport that can reach `destination` within `max_legs` legs."""
+        legs = {destination: 0}
+        queue = deque([destination])
+        while queue:
+            airport = queue.popleft()
+            if legs[airport] == max_legs:
+                continue
+            for origin in self._inbound.get(airport, ()):
+                if origin not in legs:
+                    legs[origin] = legs[airport] + 1
+                    queue.append(origin)
+        return legs
+
+
+_route_indexes: dict[str, RouteIndex] = {}
+
+
+def get_route_index(db_path: str = None) -> RouteIndex:
+    """Returns the shared, up-to-date route index for a database."""
+    db_path = db_path or DB_PATH
+    if db_path not in _route_indexes:
+        _route_indexes[db_path] = RouteIndex(db_path)
+    index = _route_indexes[db_path]
+    index.refresh()
+    return index
+
+
+def _public_leg(flight: dict) -> dict:
+    return format_row_times({column: flight[column] for column in _FLIGHT_COLUMNS})
+
+
+@tool
+def search_itineraries(
+    departure_airport: str,
+    arrival_airport: str,
+    start_time: Optional[date | datetime] = None,
+    end_time: Optional[date | datetime] = None,
+    max_stops: int = 2,
+    min_connection_minutes: int = 45,
+    max_connection_hours: int = 12,
+    limit: int = 5,
+) -> list[dict]:
+    """Find the best direct, 1-stop and 2-stop itineraries between two airports in one call.
+
+    The first leg departs between start_time (default: now) and end_time (default: three
+    days after start_time). Connections leave at least
+    min_connection_minutes and at most max_connection_hours after the previous leg lands.
+    Itineraries are ranked by arrival time, then number of stops.
+    """
+    if limit <= 0:
+        return []
+    index = get_route_index()
+    departure_airport = departure_airport.upper()
+    arrival_airport = arrival_airport.upper()
+    # Without a window the first leg could be any flight in the schedule; bound it.
+    earliest = round(time.time()) - epoch_anchor() if start_time is None else to_offset(start_time)
+    if end_time is None:
+        latest = earliest + DEFAULT_SEARCH_WINDOW.total_seconds()
+    else:
+        latest = to_offset(end_time)
+        if isinstance(end_time, date) and not isinstance(end_time, datetime):
+            latest += timedelta(days=1).total_seconds() - 1
+    min_connection = min_connection_minutes * 60
+    max_connection = max_connection_hours * 3600
+    max_legs = min(max_stops, 2) + 1
+    # Only airports that can still reach the destination in the legs left are expanded.
+    legs_to_destination = index.legs_to(arrival_airport, max_legs)
+
+    def rank(legs: list[dict]) -> tuple:
+        return (legs[-1]["_arrival_ts"], len(legs), legs[0]["_departure_ts"])
+
+    best = []  # max-heap (by rank) of the `limit` best itineraries found so far
+
+    def can_improve(arrival_ts: float) -> bool:
+        # A partial itinerary only arrives later once extended, so it is useless once the
+        # best `limit` itineraries all arrive no later than it already does.
+        return len(best) < limit or arrival_ts < -best[0][0][0]
+
+    def record(legs: list[dict]):
+        key = tuple(-value for value in rank(legs))
+        if len(best) < limit:
+            heapq.heappush(best, (key, id(legs), legs))
+        elif key > best[0][0]:
+            heapq.heapreplace(best, (key, id(legs), legs))
+
+    def extend(legs: list[dict], visited: set[str]):
+        last = legs[-1]
+        if last["arrival_airport"] == arrival_airport:
+            record(legs)
+            return
+        remaining = max_legs - len(legs)
+        ready = last["_arrival_ts"] + min_connection
+        tried = 0
+        for flight in index.departures(last["arrival_airport"], ready, last["_arrival_ts"] + max_connection):
+            if tried == MAX_CONNECTIONS_PER_HUB or not can_improve(flight["_departure_ts"]):
+                break
+            hub = flight["arrival_airport"]
+            if hub in visited or legs_to_destination.get(hub, max_legs + 1) > remaining - 1:
+                continue
+            tried += 1
+            if can_improve(flight["_arrival_ts"]):
+                extend(legs + [flight], visited | {hub})
+
+    first_legs = [
+        flight for flight in index.departures(departure_airport, earliest, latest)
+        if flight["arrival_airport"] != departure_airport
+        and legs_to_destination.get(flight["arrival_airport"], max_legs + 1) <= max_legs - 1
+    ]
+    # Earliest arrivals first, so the bound tightens quickly.
+    for flight in sorted(first_legs, key=lambda flight: flight["_arrival_ts"]):
+        if not can_improve(flight["_arrival_ts"]):
+            break
+        extend([flight], {departure_airport, flight["arrival_airport"]})
+
+    itineraries = sorted((legs for _, _, legs in best), key=rank)
+    return [
+        {
+            "stops": len(legs) - 1,
+            "departure": from_offset(legs[0]["scheduled_departure"]),
+            "arrival": from_offset(legs[-1]["scheduled_arrival"]),
+            "total_duration_minutes": round((legs[-1]["_arrival_ts"] - legs[0]["_departure_ts"]) / 60),
+            "legs": [_public_leg(flight) for flight in legs],
+        }
+        for legs in itineraries
+    ]
@@ -1,11 +1,28 @@
 # src/tools/policy_tool.py
+import threading
 from langchain_core.tools import tool
-from utils.vectorstore_setup import setup_vector_store
+from utils.vectorstore_setup import prepare_vector_store
 
-retriever = setup_vector_store()
+# The retriever is set up on first use rather than at import, so importing the tools
+# (as the benchmarks do) needs neither an OpenAI key nor the FAQ download.
+_retriever = None
+_retriever_lock = threading.Lock()
+
+def set_policy_retriever(retriever) -> None:
+    """Uses a retriever the caller has already set up (the Streamlit app sets up its own, with progress messages)."""
+    global _retriever
+    _retriever = retriever
+
+def get_policy_retriever():
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = prepare_vector_store()[0]
+    return _retriever
 
 @tool
 def lookup_policy(query: str) -> str:
     """Consult the company policies to check whether certain options are permitted."""
-    docs_result = retriever.query(query, k=2)
+    docs_result = get_policy_retriever().query(query, k=2)
     return "\n\n".join([doc.page_content for doc in docs_result])
\ No newline at end of file
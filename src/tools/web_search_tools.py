@@ -0,0 +1,162 @@
+# src/tools/web_search_tools.py
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from langchain_core.tools import tool
+from utils.admission import WEB_SEARCH, Overloaded, limiter
+from utils.single_flight import SingleFlight
+
+# --- Web Search Settings ---
+WEB_SEARCH_BACKEND = os.getenv("WEB_SEARCH_BACKEND", "tavily")  # "tavily" or "offline"
+WEB_SEARCH_MAX_RESULTS = int(os.getenv("WEB_SEARCH_MAX_RESULTS", "1"))
+WEB_SEARCH_TTL_SECONDS = float(os.getenv("WEB_SEARCH_TTL_SECONDS", "3600"))
+WEB_SEARCH_TIMEOUT_SECONDS = float(os.getenv("WEB_SEARCH_TIMEOUT_SECONDS", "5"))
+WEB_SEARCH_CACHE_SIZE = int(os.getenv("WEB_SEARCH_CACHE_SIZE", "1024"))
+WEB_SEARCH_FIXTURES = os.getenv("WEB_SEARCH_FIXTURES")  # JSON file mapping queries to results, for the offline backend
+
+
+class TavilyBackend:
+    """Searches the web with Tavily."""
+    def __init__(self, max_results: int = WEB_SEARCH_MAX_RESULTS):
+        # Imported here so the offline backend works without Tavily credentials.
+        from langchain_tavily import TavilySearch
+        self._search = TavilySearch(max_results=max_results)
+
+    def search(self, query: str) -> dict:
+        return self._search.invoke({"query": query})
+
+
+class OfflineBackend:
+    """Serves canned results from a fixtures file, for tests and benchmarks without network access."""
+    def __init__(self, fixtures_path: str = WEB_SEARCH_FIXTURES, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.fixtures = {}
+        if fixtures_path:
+            with open(fixtures_path) as f:
+                self.fixtures = {_normalize(query): results for query, results in json.load(f).items()}
+
+    def search(self, query: str) -> dict:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self.fixtures.get(_normalize(query), {"query": query, "results": []})
+
+
+WEB_SEARCH_BACKENDS = {"tavily": TavilyBackend, "offline": OfflineBackend}
+
+
+def _normalize(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class CachedWebSearch:
+    """Wraps a search backend with a TTL cache, request coalescing and a latency budget.
+
+    Identical queries (ignoring case and whitespace) share cached results until they expire,
+    and concurrent identical queries share one backend call. A search that exceeds the
+    latency budget returns an empty result with an error instead of blocking the turn; if
+    it finishes later, its result still populates the cache.
+    """
+
+    def __init__(self, backend, ttl_seconds: float = WEB_SEARCH_TTL_SECONDS, timeout_seconds: float = WEB_SEARCH_TIMEOUT_SECONDS, max_entries: int = WEB_SEARCH_CACHE_SIZE):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self.max_entries = max_entries
+        self._cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._single_flight = SingleFlight()
+        # One worker per admission slot, so an admitted search never queues behind the pool.
+        self._executor = ThreadPoolExecutor(max_workers=limiter(WEB_SEARCH).max_concurrency, thread_name_prefix="web-search")
+        self.stats = {"hits": 0, "misses": 0, "timeouts": 0, "errors": 0, "shed": 0}
+
+    def _get_cached(self, key: str):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            if entry:
+                del self._cache[key]
+            self.stats["misses"] += 1
+            return None
+
+    def _store(self, key: str, results: dict) -> None:
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.ttl_seconds, results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _fetch(self, key: str, query: str) -> dict:
+        # One latency budget covers both the wait for a search slot and the search itself.
+        deadline = time.monotonic() + self.timeout_seconds
+        resource = limiter(WEB_SEARCH)
+        try:
+            resource.admit(timeout_seconds=self.timeout_seconds)
+        except Overloaded as e:
+            self.stats["shed"] += 1
+            return {"query": query, "results": [], "error": str(e)}
+        try:
+            future = self._executor.submit(self.backend.search, query)
+        except BaseException:
+            resource.release()
+            raise
+
+        def finished(f):
+            # The slot is held until the backend call returns, even if the caller gave up on it.
+            resource.release()
+            if not f.cancelled() and f.exception() is None:
+                self._store(key, f.result())
+
+        future.add_done_callback(finished)
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            self.stats["timeouts"] += 1
+            return {"query": query, "results": [], "error": f"Web search timed out after {self.timeout_seconds}s."}
+        except Exception as e:
+            self.stats["errors"] += 1
+            return {"query": query, "results": [], "error": f"Web search failed: {e!r}"}
+
+    def search(self, query: str) -> dict:
+        key = _normalize(query)
+        cached = self._get_cached(key)
+        if cached is not None:
+            return cached
+        try:
+            return self._single_flight.do(key, lambda: self._fetch(key, query), timeout=self.timeout_seconds + 1)
+        except TimeoutError:
+            # Only a caller waiting on someone else's search gets here; the leader always returns.
+            self.stats["timeouts"] += 1
+            return {"query": query, "results": [], "error": f"Web search timed out after {self.timeout_seconds}s."}
+
+
+_web_search = None
+_web_search_lock = threading.Lock()
+
+
+def get_web_search() -> CachedWebSearch:
+    """Returns the process-wide cached web search, creating it with the configured backend."""
+    global _web_search
+    with _web_search_lock:
+        if _web_search is None:
+            _web_search = CachedWebSearch(WEB_SEARCH_BACKENDS[WEB_SEARCH_BACKEND]())
+        return _web_search
+
+
+def set_web_search_backend(backend) -> CachedWebSearch:
+    """Replaces the web search backend (and clears the cache), e.g. with an OfflineBackend."""
+    global _web_search
+    with _web_search_lock:
+        _web_search = CachedWebSearch(backend)
+        return _web_search
+
+
+@tool
+def web_search(query: str) -> dict:
+    """Search the web for up-to-date information that isn't in the company database or policies."""
+    return get_web_search().search(query)
@@ -0,0 +1,117 @@
+# src/utils/admission.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Admission Control ---
+# Each shared resource gets a concurrency limit and a bounded wait queue. A caller that
+# finds the queue full, or that waits past its deadline, is shed with `Overloaded`
+# instead of piling on, so a burst of sessions degrades into fast "busy" answers rather
+# than a provider rate-limit storm or a long SQLite writer convoy. Limits are read from
+# ADMISSION_<RESOURCE>_CONCURRENCY, _QUEUE and _TIMEOUT_SECONDS.
+LLM = "llm"
+WEB_SEARCH = "web_search"
+DB_WRITER = "db_writer"
+
+_DEFAULT_LIMITS = {
+    # (max concurrency, max queued callers, seconds a caller may wait for a slot)
+    LLM: (16, 64, 30.0),
+    WEB_SEARCH: (8, 32, 5.0),
+    DB_WRITER: (1, 32, 10.0),
+}
+
+
+class Overloaded(Exception):
+    """Raised when a resource sheds a caller because its queue is full or its deadline passed."""
+    def __init__(self, resource: str, reason: str):
+        super().__init__(f"{resource} is overloaded ({reason}); please retry shortly.")
+        self.resource = resource
+        self.reason = reason
+
+
+class ResourceLimiter:
+    """A semaphore with a bounded queue, per-caller deadlines and queue-depth stats."""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, timeout_seconds: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiting = 0
+        self._stats = {"admitted": 0, "shed_queue_full": 0, "shed_deadline": 0, "max_waiting": 0, "total_wait_s": 0.0}
+
+    @contextmanager
+    def acquire(self, timeout_seconds: float = None):
+        """Holds a slot for the duration of the block, or raises `Overloaded`."""
+        self.admit(timeout_seconds)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def admit(self, timeout_seconds: float = None) -> None:
+        """Takes a slot, or raises `Overloaded`. The caller must `release()` it exactly once."""
+        timeout = self.timeout_seconds if timeout_seconds is None else timeout_seconds
+        start = time.perf_counter()
+        # Fast path: take a free slot without queueing.
+        acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    self._stats["shed_queue_full"] += 1
+                    raise Overloaded(self.name, "queue full")
+                self._waiting += 1
+                self._stats["max_waiting"] = max(self._stats["max_waiting"], self._waiting)
+            try:
+                acquired = self._slots.acquire(timeout=timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                with self._lock:
+                    self._stats["shed_deadline"] += 1
+                raise Overloaded(self.name, f"no slot within {timeout}s")
+        with self._lock:
+            self._in_flight += 1
+            self._stats["admitted"] += 1
+            self._stats["total_wait_s"] += time.perf_counter() - start
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(in_flight=self._in_flight, waiting=self._waiting, max_concurrency=self.max_concurrency, max_queue=self.max_queue)
+        stats["avg_wait_s"] = round(stats.pop("total_wait_s") / stats["admitted"], 4) if stats["admitted"] else 0.0
+        return stats
+
+
+def _limiter_from_env(name: str) -> ResourceLimiter:
+    concurrency, queue, timeout = _DEFAULT_LIMITS[name]
+    prefix = f"ADMISSION_{name.upper()}"
+    return ResourceLimiter(
+        name,
+        max_concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", concurrency)),
+        max_queue=int(os.getenv(f"{prefix}_QUEUE", queue)),
+        timeout_seconds=float(os.getenv(f"{prefix}_TIMEOUT_SECONDS", timeout)),
+    )
+
+
+_limiters = {name: _limiter_from_env(name) for name in _DEFAULT_LIMITS}
+
+
+def limiter(name: str) -> ResourceLimiter:
+    """Returns the process-wide limiter for a resource."""
+    return _limiters[name]
+
+
+def admission_stats() -> dict:
+    """Current queue depth, in-flight count and shed counts per resource."""
+    return {name: resource.stats() for name, resource in _limiters.items()}
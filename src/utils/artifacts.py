@@ -0,0 +1,182 @@
+# src/utils/artifacts.py
+"""Prebuilt, versioned data bundles for fast and offline startup.
+
+A bundle holds everything the app otherwise prepares at startup: the travel database with
+its epoch-offset time columns, passenger_itinerary table, tool-query indexes and fresh
+statistics (VACUUMed), the policy vector index, and a manifest.
+
+Build one (from src/):
+
+    python -m utils.artifacts build --out ../artifacts
+    python -m utils.artifacts verify --out ../artifacts
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+from datetime import datetime, timezone
+
+# --- Path Correction ---
+_CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+_SRC_DIR = os.path.dirname(_CURRENT_DIR)
+_PROJECT_ROOT = os.path.dirname(_SRC_DIR)
+
+# --- Bundle Layout ---
+ARTIFACT_BUNDLE_DIR = os.getenv("ARTIFACT_BUNDLE_DIR", os.path.join(_PROJECT_ROOT, "artifacts"))
+BUNDLE_FORMAT = 2
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+BUNDLE_DB_FILE = "travel2.sqlite"
+BUNDLE_VECTOR_DIR = "chroma_db_faq"
+SOURCE_DB_URL = "https://storage.googleapis.com/benchmarks-artifacts/travel-db/travel2.sqlite"
+
+# Indexes for the columns the search tools filter on.
+_TOOL_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_flights_arrival ON flights (arrival_airport, scheduled_departure_offset)",
+    "CREATE INDEX IF NOT EXISTS idx_hotels_location ON hotels (location)",
+    "CREATE INDEX IF NOT EXISTS idx_car_rentals_location ON car_rentals (location)",
+    "CREATE INDEX IF NOT EXISTS idx_trip_recommendations_location ON trip_recommendations (location)",
+]
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fetch_source_db(source: str | None, dest: str) -> None:
+    if source and os.path.exists(source):
+        shutil.copy(source, dest)
+        return
+    import requests
+    response = requests.get(source or SOURCE_DB_URL)
+    response.raise_for_status()
+    with open(dest, "wb") as f:
+        f.write(response.content)
+
+
+def _build_database(db_path: str) -> str | None:
+    """Adds time offsets, derived tables and indexes, refreshes statistics and compacts the database."""
+    from utils.db_setup import add_time_offsets, build_passenger_itinerary
+    date_anchor = add_time_offsets(db_path)
+    build_passenger_itinerary(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        for statement in _TOOL_INDEXES:
+            conn.execute(statement)
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return date_anchor
+
+
+def _build_vector_index(persist_directory: str) -> dict:
+    from langchain_chroma import Chroma
+    from langchain_openai import OpenAIEmbeddings
+    from utils.vectorstore_setup import build_vector_index, load_policy_documents
+    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    vector_store = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    return build_vector_index(load_policy_documents(), vector_store, embeddings, persist_directory)
+
+
+def build_bundle(out_dir: str, version: str | None = None, source: str | None = None, skip_vectors: bool = False) -> dict:
+    """Builds a bundle under `out_dir/<version>`, points `out_dir/CURRENT` at it and returns its manifest."""
+    version = version or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    bundle_dir = os.path.join(out_dir, version)
+    if os.path.exists(bundle_dir):
+        raise FileExistsError(f"Bundle {bundle_dir} already exists.")
+    os.makedirs(bundle_dir)
+
+    db_path = os.path.join(bundle_dir, BUNDLE_DB_FILE)
+    _fetch_source_db(source, db_path)
+    date_anchor = _build_database(db_path)
+    files = {BUNDLE_DB_FILE: _sha256(db_path)}
+
+    vector_stats = None
+    if not skip_vectors:
+        vector_stats = _build_vector_index(os.path.join(bundle_dir, BUNDLE_VECTOR_DIR))
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "date_anchor": date_anchor,
+        "files": files,
+        "vector_index": BUNDLE_VECTOR_DIR if vector_stats else None,
+        "vector_stats": vector_stats,
+    }
+    with open(os.path.join(bundle_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    with open(os.path.join(out_dir, CURRENT_FILE), "w") as f:
+        f.write(version)
+    return manifest
+
+
+def current_bundle(root: str = ARTIFACT_BUNDLE_DIR) -> tuple[str, dict] | None:
+    """Returns (bundle directory, manifest) for the bundle `root/CURRENT` names, or None."""
+    current_path = os.path.join(root, CURRENT_FILE)
+    if not os.path.exists(current_path):
+        return None
+    with open(current_path) as f:
+        bundle_dir = os.path.join(root, f.read().strip())
+    manifest_path = os.path.join(bundle_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != BUNDLE_FORMAT:
+        return None
+    return bundle_dir, manifest
+
+
+def bundle_vector_directory(root: str = ARTIFACT_BUNDLE_DIR) -> str | None:
+    """The current bundle's prebuilt policy index directory, if it has one."""
+    bundle = current_bundle(root)
+    if bundle is None or not bundle[1].get("vector_index"):
+        return None
+    return os.path.join(bundle[0], bundle[1]["vector_index"])
+
+
+def verify_bundle(root: str = ARTIFACT_BUNDLE_DIR) -> dict:
+    """Checks the current bundle's files against the hashes in its manifest."""
+    bundle = current_bundle(root)
+    if bundle is None:
+        return {"ok": False, "error": f"No bundle found under {root}."}
+    bundle_dir, manifest = bundle
+    mismatched = [
+        name for name, digest in manifest["files"].items()
+        if not os.path.exists(os.path.join(bundle_dir, name)) or _sha256(os.path.join(bundle_dir, name)) != digest
+    ]
+    return {"ok": not mismatched, "version": manifest["version"], "mismatched": mismatched}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.artifacts", description="Build or verify a prebuilt data bundle.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="Build a new bundle and make it current.")
+    build.add_argument("--out", default=ARTIFACT_BUNDLE_DIR)
+    build.add_argument("--version", help="Bundle version (default: a UTC timestamp).")
+    build.add_argument("--source", help="Path or URL of the source travel database.")
+    build.add_argument("--skip-vectors", action="store_true", help="Don't build the policy vector index (no OpenAI key needed).")
+    verify = subcommands.add_parser("verify", help="Check the current bundle against its manifest.")
+    verify.add_argument("--out", default=ARTIFACT_BUNDLE_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        manifest = build_bundle(args.out, args.version, args.source, args.skip_vectors)
+        print(json.dumps(manifest, indent=2))
+        return 0
+    result = verify_bundle(args.out)
+    print(json.dumps(result, indent=2))
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
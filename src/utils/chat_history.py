@@ -0,0 +1,37 @@
+# src/utils/chat_history.py
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, RemoveMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from utils.checkpoint_store import prune_checkpoints
+
+
+def displayable_messages(messages: list[AnyMessage]) -> list[AnyMessage]:
+    """Keeps the messages a chat UI shows: user turns and AI messages with text."""
+    return [
+        msg for msg in messages
+        if isinstance(msg, HumanMessage) or (isinstance(msg, AIMessage) and msg.content)
+    ]
+
+
+def trim_thread_history(graph, config: dict, max_messages: int) -> int:
+    """Drops the oldest messages of a thread's checkpointed state beyond `max_messages`.
+
+    The cut is moved forward to the next user message so a tool call is never separated
+    from its result. Threads waiting for tool approval are left alone. With an in-memory
+    checkpointer the thread's older checkpoints are pruned as well, since they still hold
+    the dropped messages. Returns the number of messages removed.
+    """
+    snapshot = graph.get_state(config)
+    if snapshot.next:
+        return 0
+    messages = snapshot.values.get("messages", [])
+    if len(messages) <= max_messages:
+        return 0
+    cut = len(messages) - max_messages
+    while cut < len(messages) and not isinstance(messages[cut], HumanMessage):
+        cut += 1
+    if cut >= len(messages):
+        return 0
+    graph.update_state(config, {"messages": [RemoveMessage(id=msg.id) for msg in messages[:cut]]})
+    if isinstance(graph.checkpointer, InMemorySaver):
+        prune_checkpoints(graph.checkpointer, config["configurable"]["thread_id"])
+    return cut
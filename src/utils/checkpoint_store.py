@@ -0,0 +1,286 @@
+# src/utils/checkpoint_store.py
+import hashlib
+import json
+import threading
+import zlib
+from collections import Counter
+from contextlib import nullcontext
+from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# --- Compacting Checkpoints ---
+# InMemorySaver keeps every checkpoint of a thread, and each one re-serializes the whole
+# `messages` channel, so a long conversation's memory grows roughly with the square of its
+# length. CompactingSerializer stores each message body once in a content-addressed store
+# and serializes message lists as lists of hashes, so a new checkpoint only adds the
+# messages that are new since the last one. Message text is stored separately from the
+# rest of the message, so identical tool payloads (the same search results in different
+# threads) are kept once. Blobs above a size threshold are zlib-compressed. Each stored
+# body is reference-counted, so dropping a checkpoint frees exactly the bodies only it used,
+# without scanning every other thread.
+COMPRESS_MIN_BYTES = 1024
+_MESSAGE_REFS = "msgrefs"
+_MESSAGE_REF = "msgref"
+_COMPRESSED_PREFIX = "z:"
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+class CompactingSerializer:
+    """A checkpoint serializer that deduplicates messages and compresses large blobs."""
+
+    def __init__(self, inner=None, compress_min_bytes: int = COMPRESS_MIN_BYTES):
+        self.inner = inner or JsonPlusSerializer()
+        self.compress_min_bytes = compress_min_bytes
+        self._lock = threading.Lock()
+        self._store: dict[str, bytes] = {}  # hash -> (possibly compressed) payload
+        self._compressed: set[str] = set()
+        self._refs: dict[str, int] = {}  # hash -> number of serialized values referring to it
+        self.stats = {"stored": 0, "deduplicated": 0}
+
+    # --- Content-addressed store ---
+    def _put(self, data: bytes) -> str:
+        key = _digest(data)
+        with self._lock:
+            self._refs[key] = self._refs.get(key, 0) + 1
+            if key in self._store:
+                self.stats["deduplicated"] += 1
+                return key
+            if len(data) >= self.compress_min_bytes:
+                self._store[key] = zlib.compress(data)
+                self._compressed.add(key)
+            else:
+                self._store[key] = data
+            self.stats["stored"] += 1
+        return key
+
+    def _get(self, key: str) -> bytes:
+        with self._lock:
+            data = self._store[key]
+            compressed = key in self._compressed
+        return zlib.decompress(data) if compressed else data
+
+    # --- Messages ---
+    def _dump_message(self, message: BaseMessage) -> list:
+        content_key = None
+        if isinstance(message.content, str) and message.content:
+            content_key = self._put(message.content.encode("utf-8"))
+            message = message.model_copy(update={"content": ""})
+        type_, data = self.inner.dumps_typed(message)
+        return [type_, self._put(data), content_key]
+
+    def _load_message(self, ref: list) -> BaseMessage:
+        type_, envelope_key, content_key = ref
+        message = self.inner.loads_typed((type_, self._get(envelope_key)))
+        if content_key is not None:
+            message = message.model_copy(update={"content": self._get(content_key).decode("utf-8")})
+        return message
+
+    # --- SerializerProtocol ---
+    def dumps_typed(self, obj) -> tuple[str, bytes]:
+        if isinstance(obj, list) and obj and all(isinstance(item, BaseMessage) for item in obj):
+            refs = [self._dump_message(message) for message in obj]
+            return _MESSAGE_REFS, json.dumps(refs).encode("utf-8")
+        if isinstance(obj, BaseMessage):
+            return _MESSAGE_REF, json.dumps(self._dump_message(obj)).encode("utf-8")
+        type_, data = self.inner.dumps_typed(obj)
+        if len(data) >= self.compress_min_bytes:
+            return _COMPRESSED_PREFIX + type_, zlib.compress(data)
+        return type_, data
+
+    def loads_typed(self, data: tuple[str, bytes]):
+        type_, payload = data
+        if type_ == _MESSAGE_REFS:
+            return [self._load_message(ref) for ref in json.loads(payload)]
+        if type_ == _MESSAGE_REF:
+            return self._load_message(json.loads(payload))
+        if type_.startswith(_COMPRESSED_PREFIX):
+            return self.inner.loads_typed((type_[len(_COMPRESSED_PREFIX):], zlib.decompress(payload)))
+        return self.inner.loads_typed(data)
+
+    # --- Housekeeping ---
+    @staticmethod
+    def _key_references(typed: tuple[str, bytes]) -> list[str]:
+        """The store keys a serialized value points to, once per reference."""
+        if typed[0] == _MESSAGE_REF:
+            refs = [json.loads(typed[1])]
+        elif typed[0] == _MESSAGE_REFS:
+            refs = json.loads(typed[1])
+        else:
+            return []
+        return [key for _, envelope_key, content_key in refs for key in (envelope_key, content_key) if key]
+
+    @staticmethod
+    def referenced_keys(typed: tuple[str, bytes]) -> set[str]:
+        """The store keys a serialized value points to."""
+        return set(CompactingSerializer._key_references(typed))
+
+    def release(self, typed: tuple[str, bytes]) -> int:
+        """Forgets a serialized value the saver no longer holds; frees bodies nothing else uses. Returns the count."""
+        freed = 0
+        with self._lock:
+            for key in self._key_references(typed):
+                count = self._refs.get(key, 0) - 1
+                if count > 0:
+                    self._refs[key] = count
+                    continue
+                self._refs.pop(key, None)
+                if self._store.pop(key, None) is not None:
+                    self._compressed.discard(key)
+                    freed += 1
+        return freed
+
+    def drop_unreferenced(self, references: Counter) -> int:
+        """Resets the reference counts to `references` and drops entries with none. Returns the count.
+
+        The caller must keep new checkpoints from being written until this returns, or
+        an entry a checkpoint is about to reference could be dropped.
+        """
+        with self._lock:
+            self._refs = dict(references)
+            unused = set(self._store) - set(references)
+            for key in unused:
+                del self._store[key]
+                self._compressed.discard(key)
+        return len(unused)
+
+    def size_of(self, keys: set[str]) -> int:
+        with self._lock:
+            return sum(len(self._store[key]) for key in keys if key in self._store)
+
+    def store_bytes(self) -> int:
+        with self._lock:
+            return sum(len(data) for data in self._store.values())
+
+
+def _typed_values(saver: InMemorySaver, thread_id: str = None):
+    """Every serialized (type, bytes) value the saver holds, optionally for one thread."""
+    for thread, namespaces in list(saver.storage.items()):
+        if thread_id is not None and thread != thread_id:
+            continue
+        for checkpoints in list(namespaces.values()):
+            for checkpoint, metadata, _parent in list(checkpoints.values()):
+                yield "checkpoint", checkpoint
+                yield "checkpoint", metadata
+    for key, value in list(saver.blobs.items()):
+        if thread_id is None or key[0] == thread_id:
+            yield "channel", value
+    for key, writes in list(saver.writes.items()):
+        if thread_id is None or key[0] == thread_id:
+            for write in list(writes.values()):
+                yield "write", write[2]
+
+
+class CompactingSaver(InMemorySaver):
+    """An InMemorySaver whose checkpoints share message bodies and compress large blobs.
+
+    Every value the saver drops or overwrites is released from the serializer's reference
+    counts, so freeing a thread or its old checkpoints costs time in proportion to what is
+    dropped. Writes, releases and full collections share a lock. The async methods of
+    InMemorySaver call the sync ones, so they are covered too.
+    """
+
+    def __init__(self, compress_min_bytes: int = COMPRESS_MIN_BYTES):
+        super().__init__(serde=CompactingSerializer(compress_min_bytes=compress_min_bytes))
+        self._write_lock = threading.RLock()
+
+    def _release(self, values: list[tuple[str, bytes]]) -> None:
+        for typed in values:
+            self.serde.release(typed)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        configurable = config["configurable"]
+        thread_id, namespace = configurable["thread_id"], configurable.get("checkpoint_ns", "")
+        blob_keys = [(thread_id, namespace, channel, version) for channel, version in new_versions.items()]
+        with self._write_lock:
+            replaced = [self.blobs[key] for key in blob_keys if key in self.blobs]
+            previous = self.storage.get(thread_id, {}).get(namespace, {}).get(checkpoint["id"])
+            if previous is not None:
+                replaced += [previous[0], previous[1]]
+            result = super().put(config, checkpoint, metadata, new_versions)
+            self._release(replaced)
+            return result
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        configurable = config["configurable"]
+        outer_key = (configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"])
+        with self._write_lock:
+            before = dict(self.writes.get(outer_key, {}))
+            result = super().put_writes(config, writes, task_id, task_path)
+            after = self.writes.get(outer_key, {})
+            self._release([write[2] for inner_key, write in before.items() if after.get(inner_key) is not write])
+            return result
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._write_lock:
+            dropped = [typed for _, typed in _typed_values(self, thread_id)]
+            super().delete_thread(thread_id)
+            self._release(dropped)
+
+    def collect_garbage(self) -> int:
+        """Recounts references across every thread and frees bodies nothing refers to. Returns the number freed.
+
+        Not needed in normal operation, since dropped values are released as they go; this
+        is a full sweep that also recovers anything a failed write left counted.
+        """
+        with self._write_lock:
+            references = Counter()
+            for _, typed in _typed_values(self):
+                references.update(CompactingSerializer._key_references(typed))
+            return self.serde.drop_unreferenced(references)
+
+
+def prune_checkpoints(saver: InMemorySaver, thread_id: str) -> int:
+    """Drops every checkpoint of a thread except the latest in each namespace. Returns the count.
+
+    InMemorySaver keeps a thread's whole checkpoint history, so messages trimmed from the
+    latest state stay in memory through the older checkpoints until those are removed too.
+    The thread's state history (time travel) is lost. Channel values and pending writes
+    only the dropped checkpoints used are freed with them.
+    """
+    removed, dropped = 0, []
+    with saver._write_lock if isinstance(saver, CompactingSaver) else nullcontext():
+        for namespace, checkpoints in list(saver.storage.get(thread_id, {}).items()):
+            if len(checkpoints) < 2:
+                continue
+            latest_id = max(checkpoints)  # checkpoint IDs are time-ordered
+            latest = saver.serde.loads_typed(checkpoints[latest_id][0])
+            kept_versions = set(latest["channel_versions"].items())
+            for checkpoint_id in [key for key in checkpoints if key != latest_id]:
+                checkpoint, metadata, _parent = checkpoints.pop(checkpoint_id)
+                dropped += [checkpoint, metadata]
+                dropped += [write[2] for write in saver.writes.pop((thread_id, namespace, checkpoint_id), {}).values()]
+                removed += 1
+            for key in [key for key in saver.blobs if key[0] == thread_id and key[1] == namespace]:
+                if (key[2], key[3]) not in kept_versions:
+                    dropped.append(saver.blobs.pop(key))
+        if isinstance(saver, CompactingSaver):
+            saver._release(dropped)
+    return removed
+
+
+def conversation_bytes(saver: InMemorySaver, thread_id: str) -> dict:
+    """Measures how many bytes a thread's checkpoints occupy in an in-memory saver.
+
+    Works for plain InMemorySaver too. For a CompactingSaver, `shared_payload_bytes` is
+    the size of the deduplicated message bodies the thread refers to; those may also be
+    referenced by other threads.
+    """
+    sizes = {"checkpoint": 0, "channel": 0, "write": 0}
+    referenced = set()
+    checkpoints = sum(len(c) for c in saver.storage.get(thread_id, {}).values())
+    for kind, typed in _typed_values(saver, thread_id):
+        sizes[kind] += len(typed[1])
+        referenced |= CompactingSerializer.referenced_keys(typed)
+    shared = saver.serde.size_of(referenced) if isinstance(saver, CompactingSaver) else 0
+    return {
+        "checkpoints": checkpoints,
+        "checkpoint_bytes": sizes["checkpoint"],
+        "channel_bytes": sizes["channel"],
+        "write_bytes": sizes["write"],
+        "shared_payload_bytes": shared,
+        "total_bytes": sum(sizes.values()) + shared,
+    }
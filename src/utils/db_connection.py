@@ -0,0 +1,232 @@
+# src/utils/db_connection.py
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from utils.admission import DB_WRITER, limiter
+
+# --- Read-Replica Snapshot Settings ---
+# When enabled, read-only tools are served from an immutable, memory-mapped copy of the
+# primary database kept in RAM (/dev/shm when available). Sensitive tools keep writing to
+# the primary file. When the primary changes, reads keep using the newest complete snapshot
+# while a background thread builds the next one; only the very first read builds inline.
+SNAPSHOT_ENABLED = os.getenv("DB_READ_SNAPSHOT", "0").lower() in ("1", "true", "yes")
+SNAPSHOT_DIR = os.getenv(
+    "DB_SNAPSHOT_DIR",
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+)
+SNAPSHOT_MMAP_SIZE = int(os.getenv("DB_SNAPSHOT_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+_snapshot_lock = threading.Lock()
+_refreshers_lock = threading.Lock()
+_refreshers: dict[str, "_SnapshotRefresher"] = {}
+
+
+def primary_version(db_path: str) -> str:
+    """Identifies the current state of the primary file.
+
+    SQLite increments the file change counter in the database header (bytes 24-27) on
+    every commit, even one that rewrites pages in place without changing the file size
+    or, at coarse timestamp resolution, its mtime. The mtime comes first so versions of a
+    replaced file still sort after those of the one it replaced.
+    """
+    stat = os.stat(db_path)
+    with open(db_path, "rb") as f:
+        f.seek(24)
+        change_counter = int.from_bytes(f.read(4), "big")
+    return f"{stat.st_mtime_ns}-{change_counter}"
+
+
+def _version_order(version: str) -> tuple[int, int]:
+    mtime, change_counter = version.split("-")
+    return int(mtime), int(change_counter)
+
+
+def _snapshot_prefix(db_path: str) -> str:
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    return f"{name}.snapshot."
+
+
+def _snapshot_path(db_path: str, version: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{_snapshot_prefix(db_path)}{version}.sqlite")
+
+
+def refresh_snapshot(db_path: str) -> str:
+    """Returns the snapshot matching the primary's current version, building it if needed.
+
+    Snapshot files are named after the primary's version, so worker processes share a
+    single copy. A new snapshot is written to a temporary file with the SQLite backup API
+    and moved into place with an atomic rename; readers that already opened an older
+    snapshot keep reading it until they close their connection.
+    """
+    version = primary_version(db_path)
+    snapshot_path = _snapshot_path(db_path, version)
+    if os.path.exists(snapshot_path):
+        return snapshot_path
+
+    with _snapshot_lock:
+        if os.path.exists(snapshot_path):
+            return snapshot_path
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix=".tmp")
+        os.close(fd)
+        try:
+            source = sqlite3.connect(db_path)
+            target = sqlite3.connect(tmp_path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            os.replace(tmp_path, snapshot_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _remove_stale_snapshots(db_path, keep=snapshot_path)
+    return snapshot_path
+
+
+def _snapshot_version(db_path: str, snapshot_path: str) -> str:
+    return os.path.basename(snapshot_path)[len(_snapshot_prefix(db_path)):-len(".sqlite")]
+
+
+def _latest_snapshot(db_path: str) -> str | None:
+    """The newest complete snapshot of `db_path` (possibly built for an older version), or None."""
+    prefix = _snapshot_prefix(db_path)
+    newest, newest_order = None, (-1, -1)
+    try:
+        entries = os.listdir(SNAPSHOT_DIR)
+    except OSError:
+        return None
+    for entry in entries:
+        if not entry.startswith(prefix) or not entry.endswith(".sqlite"):
+            continue
+        try:
+            order = _version_order(_snapshot_version(db_path, entry))
+        except ValueError:
+            continue
+        if order > newest_order:
+            newest, newest_order = os.path.join(SNAPSHOT_DIR, entry), order
+    return newest
+
+
+def _remove_stale_snapshots(db_path: str, keep: str) -> None:
+    """Deletes snapshots of older primary versions; newer ones may belong to another worker."""
+    prefix = _snapshot_prefix(db_path)
+    keep_order = _version_order(_snapshot_version(db_path, keep))
+    for entry in os.listdir(SNAPSHOT_DIR):
+        if not entry.startswith(prefix) or not entry.endswith(".sqlite"):
+            continue
+        try:
+            if _version_order(_snapshot_version(db_path, entry)) < keep_order:
+                os.remove(os.path.join(SNAPSHOT_DIR, entry))
+        except (ValueError, OSError):
+            pass
+
+
+def connect_readonly(db_path: str) -> sqlite3.Connection:
+    """Opens a connection for read-only tools, using the in-RAM snapshot when enabled.
+
+    If the primary has changed since the newest snapshot was built, the read is served
+    from that snapshot and a rebuild is queued in the background, so a read right after
+    a booking may not see it yet. A read only waits for a build when no snapshot exists.
+    """
+    return connect_readonly_versioned(db_path)[0]
+
+
+def connect_readonly_versioned(db_path: str) -> tuple[sqlite3.Connection, str]:
+    """Like `connect_readonly`, but also returns the primary version the connection reads.
+
+    Without snapshots the version is taken before connecting, so the data read is at
+    least that new.
+    """
+    if not SNAPSHOT_ENABLED:
+        version = primary_version(db_path)
+        return sqlite3.connect(db_path), version
+    snapshot_path = _snapshot_path(db_path, primary_version(db_path))
+    if not os.path.exists(snapshot_path):
+        _refresher(db_path).request()
+        snapshot_path = _latest_snapshot(db_path)
+    try:
+        if snapshot_path is None:
+            raise FileNotFoundError(db_path)
+        conn = sqlite3.connect(f"file:{snapshot_path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+    except (OSError, sqlite3.OperationalError):
+        # No snapshot yet, or another worker removed this one after a newer build.
+        snapshot_path = refresh_snapshot(db_path)
+        conn = sqlite3.connect(f"file:{snapshot_path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+    conn.execute(f"PRAGMA mmap_size = {SNAPSHOT_MMAP_SIZE}")
+    return conn, _snapshot_version(db_path, snapshot_path)
+
+
+def connect_primary(db_path: str) -> sqlite3.Connection:
+    """Opens a connection to the primary database for tools that write."""
+    return sqlite3.connect(db_path)
+
+
+@contextmanager
+def write_transaction(db_path: str):
+    """Runs a block of writes as one `BEGIN IMMEDIATE` transaction on the primary database.
+
+    The write lock is taken up front, so checks and updates inside the block cannot race
+    with another session. The transaction is committed on success and rolled back on error.
+    Writers queue in-process for the DB writer slot first (see utils/admission.py), so a
+    burst of bookings waits in an ordered queue, or is shed, instead of spinning on SQLite's lock.
+    After a commit, the read snapshot (when enabled) starts rebuilding in the background.
+    """
+    with limiter(DB_WRITER).acquire():
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        finally:
+            conn.close()
+    if SNAPSHOT_ENABLED:
+        _refresher(db_path).request()
+
+
+class _SnapshotRefresher:
+    """A background thread that rebuilds one database's snapshot when asked, and optionally on a schedule."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.interval_seconds = None
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-snapshot-refresher", daemon=True)
+        self._thread.start()
+
+    def request(self) -> None:
+        # Requests that arrive during a build coalesce into one more build.
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+            try:
+                refresh_snapshot(self.db_path)
+            except (OSError, sqlite3.Error):
+                continue
+
+
+def _refresher(db_path: str) -> _SnapshotRefresher:
+    with _refreshers_lock:
+        if db_path not in _refreshers:
+            _refreshers[db_path] = _SnapshotRefresher(db_path)
+        return _refreshers[db_path]
+
+
+def start_snapshot_refresher(db_path: str, interval_seconds: float) -> None:
+    """Also rebuilds the snapshot on a schedule, so it catches up even when nothing reads."""
+    if not SNAPSHOT_ENABLED:
+        return
+    refresher = _refresher(db_path)
+    refresher.interval_seconds = interval_seconds
+    refresher.request()
@@ -2,11 +2,11 @@
 import os
 import shutil
 import sqlite3
-import pandas as pd
 import requests
-import pytz
-from datetime import datetime
 import streamlit as st
+from datetime import datetime
+from utils.artifacts import BUNDLE_DB_FILE, current_bundle
+from utils.time_anchor import TIMESTAMP_COLUMNS, offset_column, set_epoch_anchor
 
 # --- Path Correction ---
 _CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -14,67 +14,231 @@ _SRC_DIR = os.path.dirname(_CURRENT_DIR)
 _PROJECT_ROOT = os.path.dirname(_SRC_DIR)
 DB_DIR = os.path.join(_PROJECT_ROOT, "db")
 
+DB_URL = "https://storage.googleapis.com/benchmarks-artifacts/travel-db/travel2.sqlite"
+LOCAL_FILE = "travel2.sqlite"
+BACKUP_FILE = "travel2.backup.sqlite"
+
+def prepare_database() -> str:
+    """Prepares the working SQLite database inside the root 'db' folder. Raises on failure.
+
+    Uses the prebuilt artifact bundle when one is installed (see utils/artifacts.py), and
+    otherwise downloads the database once and restores the working copy from its backup.
+    """
+    bundle = current_bundle()
+    if bundle is not None:
+        return _install_bundle_database(*bundle)
+    os.makedirs(DB_DIR, exist_ok=True)
+    local_path = os.path.join(DB_DIR, LOCAL_FILE)
+    backup_path = os.path.join(DB_DIR, BACKUP_FILE)
+
+    if not os.path.exists(backup_path):
+        response = requests.get(DB_URL)
+        response.raise_for_status()
+        with open(backup_path, "wb") as f:
+            f.write(response.content)
+
+    # Both are no-ops once the backup has been prepared, so later starts only copy the file.
+    add_time_offsets(backup_path)
+    if not has_passenger_itinerary(backup_path):
+        build_passenger_itinerary(backup_path)
+    shutil.copy(backup_path, local_path)
+    set_epoch_anchor(read_dataset_time(local_path)["utc_offset_seconds"])
+    return local_path
+
 @st.cache_resource
 def setup_database():
-    """Downloads, backs up, and updates the SQLite database inside the root 'db' folder."""
-    db_url = "https://storage.googleapis.com/benchmarks-artifacts/travel-db/travel2.sqlite"
-    local_file = "travel2.sqlite"
-    backup_file = "travel2.backup.sqlite"
-    
-    os.makedirs(DB_DIR, exist_ok=True) 
-    
-    local_path = os.path.join(DB_DIR, local_file)
-    backup_path = os.path.join(DB_DIR, backup_file)
-
-    if not os.path.exists(local_path):
-        with st.spinner(f"Database not found. Downloading to {local_path}..."):
-            response = requests.get(db_url)
-            response.raise_for_status()
-            with open(local_path, "wb") as f:
-                f.write(response.content)
-            shutil.copy(local_path, backup_path)
-            st.success("Database download and backup complete.")
-    
-    return _update_dates(local_path, backup_path)
-
-def _update_dates(db_path, backup_path):
-    """Updates flight and booking dates in the database to be current."""
-    shutil.copy(backup_path, db_path)
+    """Prepares the working database for the Streamlit app, showing progress while it downloads."""
+    if current_bundle() is not None or os.path.exists(os.path.join(DB_DIR, BACKUP_FILE)):
+        return prepare_database()
+    with st.spinner(f"Database not found. Downloading to {os.path.join(DB_DIR, LOCAL_FILE)}..."):
+        local_path = prepare_database()
+    st.success("Database download and backup complete.")
+    return local_path
+
+def _install_bundle_database(bundle_dir, manifest):
+    """Restores the working database from the bundle, which already has its offsets and derived tables."""
+    os.makedirs(DB_DIR, exist_ok=True)
+    local_path = os.path.join(DB_DIR, BUNDLE_DB_FILE)
+    # The bundle itself is never written to; each start gets a fresh working copy, as the
+    # legacy path does from its backup.
+    shutil.copy(os.path.join(bundle_dir, BUNDLE_DB_FILE), local_path)
+    set_epoch_anchor(read_dataset_time(local_path)["utc_offset_seconds"])
+    return local_path
+
+# --- Epoch-Offset Timestamps ---
+# Times are kept as integer seconds from the dataset's anchor (its latest actual departure),
+# next to the original text columns, so starting the app never rewrites them. See
+# utils/time_anchor.py for how offsets are mapped to the present at runtime.
+_OFFSET_TABLES = {"flights": TIMESTAMP_COLUMNS, "bookings": ("book_date",)}
+
+def _parse_timestamp(value) -> datetime | None:
+    """Parses a stored timestamp. Missing values, including travel2's '\\N' marker, and
+    anything else that isn't an ISO timestamp are treated as NULL."""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+def add_time_offsets(db_path) -> str | None:
+    """Adds and fills the indexed `*_offset` columns and the `dataset_time` table. Returns the anchor.
+
+    Databases that already have them are left untouched. The migration runs as one
+    transaction, so an interrupted run leaves the database as it was; offset columns that
+    already exist (from a migration interrupted before this was the case) are reused.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dataset_time'").fetchone():
+            return conn.execute("SELECT anchor FROM dataset_time").fetchone()[0]
+        departures = [
+            parsed
+            for (value,) in conn.execute("SELECT actual_departure FROM flights")
+            if (parsed := _parse_timestamp(value)) is not None
+        ]
+        if not departures:
+            raise ValueError(f"{db_path} has no departed flights to anchor its dates to.")
+        anchor = max(departures)
+        anchor_ts = anchor.timestamp()
+
+        def seconds_from_anchor(value):
+            parsed = _parse_timestamp(value)
+            if parsed is None:
+                return None
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=anchor.tzinfo)
+            return round(parsed.timestamp() - anchor_ts)
+
+        conn.create_function("seconds_from_anchor", 1, seconds_from_anchor, deterministic=True)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing_tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for table, columns in _OFFSET_TABLES.items():
+                if table not in existing_tables:
+                    continue
+                existing_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for column in columns:
+                    if offset_column(column) not in existing_columns:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {offset_column(column)} INTEGER")
+                assignments = ", ".join(f"{offset_column(column)} = seconds_from_anchor({column})" for column in columns)
+                conn.execute(f"UPDATE {table} SET {assignments}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_flights_departure_offset ON flights (scheduled_departure_offset)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_flights_airport_departure_offset ON flights (departure_airport, scheduled_departure_offset)")
+            conn.execute("CREATE TABLE dataset_time (anchor TEXT NOT NULL, utc_offset_seconds INTEGER NOT NULL)")
+            conn.execute(
+                "INSERT INTO dataset_time VALUES (?, ?)",
+                (anchor.isoformat(sep=" "), int(anchor.utcoffset().total_seconds()) if anchor.utcoffset() else 0),
+            )
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return anchor.isoformat(sep=" ")
+    finally:
+        conn.close()
+
+def read_dataset_time(db_path) -> dict:
+    """The dataset's anchor time and the UTC offset its times were recorded in."""
+    conn = sqlite3.connect(db_path)
+    try:
+        anchor, utc_offset_seconds = conn.execute("SELECT anchor, utc_offset_seconds FROM dataset_time").fetchone()
+    finally:
+        conn.close()
+    return {"anchor": anchor, "utc_offset_seconds": utc_offset_seconds}
+
+# --- Passenger Itinerary View ---
+# The per-turn flight lookup joins tickets, ticket_flights, flights and boarding_passes.
+# `passenger_itinerary` stores the result of that join, indexed by passenger, and triggers
+# keep it current whenever one of the source tables changes.
+_ITINERARY_COLUMNS = """
+    t.passenger_id, t.ticket_no, t.book_ref,
+    f.flight_id, f.flight_no, f.departure_airport, f.arrival_airport,
+    f.scheduled_departure_offset AS scheduled_departure, f.scheduled_arrival_offset AS scheduled_arrival,
+    bp.seat_no, tf.fare_conditions
+"""
+ITINERARY_JOIN = f"""
+    SELECT {_ITINERARY_COLUMNS}
+    FROM
+        tickets t
+        JOIN ticket_flights tf ON t.ticket_no = tf.ticket_no
+        JOIN flights f ON tf.flight_id = f.flight_id
+        JOIN boarding_passes bp ON bp.ticket_no = t.ticket_no AND bp.flight_id = f.flight_id
+"""
+
+_JOIN_KEYS = {"ticket_no": "t.ticket_no", "flight_id": "f.flight_id"}
+
+def _refresh_rows(column: str, key: str) -> str:
+    """Trigger SQL that re-derives the itinerary rows whose `column` equals `key`."""
+    return (
+        f"DELETE FROM passenger_itinerary WHERE {column} = {key};\n"
+        f"INSERT INTO passenger_itinerary {ITINERARY_JOIN} WHERE {_JOIN_KEYS[column]} = {key};"
+    )
+
+_ITINERARY_TRIGGERS = {
+    "ticket_flights_insert": ("AFTER INSERT ON ticket_flights", [_refresh_rows("ticket_no", "NEW.ticket_no")]),
+    "ticket_flights_update": ("AFTER UPDATE ON ticket_flights", [_refresh_rows("ticket_no", "OLD.ticket_no"), _refresh_rows("ticket_no", "NEW.ticket_no")]),
+    "ticket_flights_delete": ("AFTER DELETE ON ticket_flights", [_refresh_rows("ticket_no", "OLD.ticket_no")]),
+    "boarding_passes_insert": ("AFTER INSERT ON boarding_passes", [_refresh_rows("ticket_no", "NEW.ticket_no")]),
+    "boarding_passes_update": ("AFTER UPDATE ON boarding_passes", [_refresh_rows("ticket_no", "OLD.ticket_no"), _refresh_rows("ticket_no", "NEW.ticket_no")]),
+    "boarding_passes_delete": ("AFTER DELETE ON boarding_passes", [_refresh_rows("ticket_no", "OLD.ticket_no")]),
+    "tickets_insert": ("AFTER INSERT ON tickets", [_refresh_rows("ticket_no", "NEW.ticket_no")]),
+    "tickets_update": ("AFTER UPDATE ON tickets", [_refresh_rows("ticket_no", "OLD.ticket_no"), _refresh_rows("ticket_no", "NEW.ticket_no")]),
+    "tickets_delete": ("AFTER DELETE ON tickets", [_refresh_rows("ticket_no", "OLD.ticket_no")]),
+    "flights_update": ("AFTER UPDATE ON flights", [_refresh_rows("flight_id", "OLD.flight_id"), _refresh_rows("flight_id", "NEW.flight_id")]),
+    "flights_delete": ("AFTER DELETE ON flights", [_refresh_rows("flight_id", "OLD.flight_id")]),
+}
+
+def _itinerary_statements() -> list[str]:
+    statements = [
+        "DROP TABLE IF EXISTS passenger_itinerary",
+        f"CREATE TABLE passenger_itinerary AS {ITINERARY_JOIN}",
+        "CREATE INDEX IF NOT EXISTS idx_passenger_itinerary_passenger ON passenger_itinerary (passenger_id)",
+        "CREATE INDEX IF NOT EXISTS idx_passenger_itinerary_ticket ON passenger_itinerary (ticket_no)",
+        "CREATE INDEX IF NOT EXISTS idx_passenger_itinerary_flight ON passenger_itinerary (flight_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_ticket_no ON tickets (ticket_no)",
+        "CREATE INDEX IF NOT EXISTS idx_ticket_flights_ticket_no ON ticket_flights (ticket_no)",
+        "CREATE INDEX IF NOT EXISTS idx_ticket_flights_flight_id ON ticket_flights (flight_id)",
+        "CREATE INDEX IF NOT EXISTS idx_boarding_passes_ticket_flight ON boarding_passes (ticket_no, flight_id)",
+        "CREATE INDEX IF NOT EXISTS idx_flights_flight_id ON flights (flight_id)",
+    ]
+    for name, (event, trigger_statements) in _ITINERARY_TRIGGERS.items():
+        body = "\n".join(trigger_statements)
+        statements.append(f"DROP TRIGGER IF EXISTS passenger_itinerary_{name}")
+        statements.append(f"CREATE TRIGGER passenger_itinerary_{name} {event} BEGIN\n{body}\nEND")
+    return statements
+
+def build_passenger_itinerary(db_path):
+    """(Re)builds the materialized passenger_itinerary table, its index and maintenance triggers in one transaction."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in _itinerary_statements():
+                conn.execute(statement)
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    finally:
+        conn.close()
+
+def has_passenger_itinerary(db_path) -> bool:
+    """Whether the database already has passenger_itinerary (which is always built together with its triggers)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'passenger_itinerary'").fetchone() is not None
+    finally:
+        conn.close()
+
+def check_passenger_itinerary(db_path) -> dict:
+    """Compares passenger_itinerary against the live join and returns the rows that differ."""
     conn = sqlite3.connect(db_path)
-    
     try:
-        tables_df = pd.read_sql("SELECT name FROM sqlite_master WHERE type='table';", conn)
-        tables = tables_df["name"].tolist()
-        tdf = {t: pd.read_sql(f"SELECT * FROM {t}", conn) for t in tables}
-
-        if "flights" in tdf and not tdf["flights"].empty:
-            # FIX: Convert actual_departure to datetime, coercing errors to NaT
-            departures = pd.to_datetime(tdf["flights"]["actual_departure"], errors='coerce')
-            
-            # Now, find the maximum valid datetime, which will be ignored if all are NaT
-            example_time = departures.max()
-            
-            if pd.notna(example_time):
-                current_time = pd.to_datetime("now").tz_localize(example_time.tz)
-                time_diff = current_time - example_time
-
-                # Apply the fix to other date columns as well for robustness
-                tdf["bookings"]["book_date"] = (
-                    pd.to_datetime(tdf["bookings"]["book_date"], errors='coerce', utc=True) + time_diff
-                )
-
-                datetime_columns = ["scheduled_departure", "scheduled_arrival", "actual_departure", "actual_arrival"]
-                for column in datetime_columns:
-                    # Coerce errors here too to handle any bad data
-                    tdf["flights"][column] = (
-                        pd.to_datetime(tdf["flights"][column], errors='coerce') + time_diff
-                    )
-
-                for table_name, df in tdf.items():
-                    df.to_sql(table_name, conn, if_exists="replace", index=False)
-                
-                conn.commit()
+        columns = "passenger_id, ticket_no, book_ref, flight_id, flight_no, departure_airport, arrival_airport, " \
+                  "scheduled_departure, scheduled_arrival, seat_no, fare_conditions"
+        missing = conn.execute(f"{ITINERARY_JOIN} EXCEPT SELECT {columns} FROM passenger_itinerary").fetchall()
+        extra = conn.execute(f"SELECT {columns} FROM passenger_itinerary EXCEPT {ITINERARY_JOIN}").fetchall()
     finally:
         conn.close()
-        
-    return db_path
\ No newline at end of file
+    return {"consistent": not missing and not extra, "missing": missing, "extra": extra}
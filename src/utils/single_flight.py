@@ -0,0 +1,52 @@
+# src/utils/single_flight.py
+import threading
+from typing import Any, Callable, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key.
+
+    The first caller for a key runs the function; callers that arrive while it is still
+    running wait for it and receive the same result (or exception). Nothing is cached
+    once the call finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: float = None) -> Any:
+        """Runs `fn` for `key`, or waits for the call already in flight, and returns its result."""
+        return self.do_shared(key, fn, timeout)[0]
+
+    def do_shared(self, key: Hashable, fn: Callable[[], Any], timeout: float = None) -> tuple[Any, bool]:
+        """Like `do`, but also returns whether the result came from another caller's call."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        elif not call.done.wait(timeout):
+            raise TimeoutError(f"Timed out waiting for an in-flight call for {key!r}.")
+        if call.error is not None:
+            raise call.error
+        return call.result, not leader
@@ -0,0 +1,57 @@
+# src/utils/time_anchor.py
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+
+# --- Epoch-Offset Timestamps ---
+# Flight and booking times are stored as integer seconds relative to the dataset's anchor
+# (its latest actual departure) in indexed `<column>_offset` columns. At runtime, offset 0
+# is pinned to the moment the app started (DB_EPOCH_ANCHOR), so the schedule is always
+# current without rewriting the database, and time filters compare integers.
+TIMESTAMP_COLUMNS = ("scheduled_departure", "scheduled_arrival", "actual_departure", "actual_arrival")
+
+_STARTED_AT = time.time()
+
+
+def offset_column(column: str) -> str:
+    return f"{column}_offset"
+
+
+def set_epoch_anchor(utc_offset_seconds: int, anchor: float = None) -> None:
+    """Pins offset 0 to `anchor` (default: now) and sets the timezone times are shown in."""
+    os.environ["DB_EPOCH_ANCHOR"] = str(int(anchor if anchor is not None else time.time()))
+    os.environ["DB_DISPLAY_UTC_OFFSET"] = str(int(utc_offset_seconds))
+
+
+def epoch_anchor() -> int:
+    return int(float(os.getenv("DB_EPOCH_ANCHOR", _STARTED_AT)))
+
+
+def display_timezone() -> timezone:
+    return timezone(timedelta(seconds=int(os.getenv("DB_DISPLAY_UTC_OFFSET", "0"))))
+
+
+def to_offset(value: date | datetime | None) -> int | None:
+    """Converts a tool argument to a stored offset. Naive values are read in the display timezone."""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=display_timezone())
+    return int(value.timestamp()) - epoch_anchor()
+
+
+def from_offset(offset: int | None) -> str | None:
+    """Renders a stored offset as a present-day timestamp string."""
+    if offset is None:
+        return None
+    return datetime.fromtimestamp(epoch_anchor() + offset, tz=display_timezone()).isoformat(sep=" ")
+
+
+def format_row_times(row: dict) -> dict:
+    """Renders every timestamp column of a row that holds a stored offset."""
+    for column in TIMESTAMP_COLUMNS:
+        if column in row:
+            row[column] = from_offset(row[column])
+    return row
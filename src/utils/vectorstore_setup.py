@@ -1,12 +1,20 @@
 # src/utils/vectorstore_setup.py
+import hashlib
+import json
 import os
+import random
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 import streamlit as st
 import openai  # Import the openai library to catch the specific error
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
+from utils.artifacts import bundle_vector_directory
+from utils.single_flight import SingleFlight
 
 # --- Path Correction ---
 _CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -14,6 +22,26 @@ _SRC_DIR = os.path.dirname(_CURRENT_DIR)
 _PROJECT_ROOT = os.path.dirname(_SRC_DIR)
 DB_DIR = os.path.join(_PROJECT_ROOT, "db")
 
+# --- Index Build Settings ---
+INDEX_BATCH_SIZE = int(os.getenv("VECTOR_INDEX_BATCH_SIZE", "64"))
+INDEX_MAX_CONCURRENCY = int(os.getenv("VECTOR_INDEX_CONCURRENCY", "4"))
+INDEX_MAX_RETRIES = int(os.getenv("VECTOR_INDEX_MAX_RETRIES", "6"))
+INDEX_MANIFEST = "index_build.json"
+FAQ_URL = "https://storage.googleapis.com/benchmarks-artifacts/travel-db/swiss_faq.md"
+
+embedding_single_flight = SingleFlight()
+
+class CoalescingEmbeddings(Embeddings):
+    """Wraps an embedding model so concurrent identical query embeddings share one API call."""
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return embedding_single_flight.do(text, lambda: self.embeddings.embed_query(text))
+
 class VectorStoreRetriever:
     """A retriever that encapsulates a Chroma vector store."""
     def __init__(self, vector_store: Chroma):
@@ -22,41 +50,159 @@ class VectorStoreRetriever:
     def query(self, query: str, k: int = 5) -> list[Document]:
         return self.vector_store.similarity_search(query, k=k)
 
+def document_id(doc: Document) -> str:
+    """A stable ID derived from the document's content, so rebuilds upsert instead of duplicating."""
+    return hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()[:32]
+
+def _embed_with_retry(embeddings: Embeddings, texts: list[str], max_retries: int) -> list[list[float]]:
+    """Embeds a batch, backing off exponentially (with jitter) when the provider rate-limits us."""
+    for attempt in range(max_retries + 1):
+        try:
+            return embeddings.embed_documents(texts)
+        except openai.RateLimitError:
+            if attempt == max_retries:
+                raise
+            time.sleep(min(60, 2 ** attempt) + random.uniform(0, 1))
+
+def _upsert(vector_store: Chroma, batch: list[tuple[str, Document]], vectors: list[list[float]]) -> None:
+    """Upserts precomputed embeddings. Chroma rejects empty metadata, so those documents go in without it."""
+    with_metadata = [(item, vector) for item, vector in zip(batch, vectors) if item[1].metadata]
+    without_metadata = [(item, vector) for item, vector in zip(batch, vectors) if not item[1].metadata]
+    for group, has_metadata in ((with_metadata, True), (without_metadata, False)):
+        if not group:
+            continue
+        vector_store._collection.upsert(
+            ids=[doc_id for (doc_id, _), _ in group],
+            embeddings=[vector for _, vector in group],
+            documents=[doc.page_content for (_, doc), _ in group],
+            metadatas=[doc.metadata for (_, doc), _ in group] if has_metadata else None,
+        )
+
+def _write_manifest(persist_directory: str, **fields) -> None:
+    os.makedirs(persist_directory, exist_ok=True)
+    with open(os.path.join(persist_directory, INDEX_MANIFEST), "w") as f:
+        json.dump(fields, f)
+
+def index_is_complete(persist_directory: str) -> bool:
+    """Whether a persisted index finished building. Stores from before build manifests count as complete."""
+    if not os.path.exists(persist_directory):
+        return False
+    manifest_path = os.path.join(persist_directory, INDEX_MANIFEST)
+    if not os.path.exists(manifest_path):
+        return True
+    with open(manifest_path) as f:
+        return json.load(f).get("complete", False)
+
+def build_vector_index(
+    docs: list[Document],
+    vector_store: Chroma,
+    embeddings: Embeddings,
+    persist_directory: str,
+    batch_size: int = INDEX_BATCH_SIZE,
+    max_concurrency: int = INDEX_MAX_CONCURRENCY,
+    max_retries: int = INDEX_MAX_RETRIES,
+) -> dict:
+    """Embeds and upserts documents in batches, resuming from whatever a previous run persisted.
+
+    Documents are keyed by a content hash. Any already present in the store are skipped, so
+    an interrupted build picks up where it stopped. Batches are embedded concurrently, with
+    at most `max_concurrency` requests in flight, and upserted as they complete. Returns
+    throughput stats.
+    """
+    start = time.perf_counter()
+    unique = {document_id(doc): doc for doc in docs}
+    existing = set(vector_store.get(ids=list(unique), include=[])["ids"]) if unique else set()
+    pending = [(doc_id, doc) for doc_id, doc in unique.items() if doc_id not in existing]
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    _write_manifest(persist_directory, complete=False, documents=len(unique))
+
+    embedded = 0
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    futures = {
+        executor.submit(_embed_with_retry, embeddings, [doc.page_content for _, doc in batch], max_retries): batch
+        for batch in batches
+    }
+    upserted = set()
+    try:
+        for future in as_completed(futures):
+            batch = futures[future]
+            vectors = future.result()
+            _upsert(vector_store, batch, vectors)
+            upserted.add(future)
+            embedded += len(batch)
+    except BaseException:
+        # Don't embed the queued batches only to throw them away, but keep the ones that
+        # already finished so the next run resumes after them.
+        executor.shutdown(wait=True, cancel_futures=True)
+        for future, batch in futures.items():
+            if future not in upserted and not future.cancelled() and future.exception() is None:
+                _upsert(vector_store, batch, future.result())
+        raise
+    finally:
+        executor.shutdown()
+
+    seconds = time.perf_counter() - start
+    stats = {
+        "documents": len(unique),
+        "embedded": embedded,
+        "skipped": len(existing),
+        "batches": len(batches),
+        "seconds": round(seconds, 3),
+        "docs_per_second": round(embedded / seconds, 2) if seconds else 0.0,
+    }
+    _write_manifest(persist_directory, complete=True, **stats)
+    return stats
+
+def load_policy_documents() -> list[Document]:
+    """Downloads the Swiss Airlines FAQ and splits it into one document per section."""
+    response = requests.get(FAQ_URL)
+    response.raise_for_status()
+    return [Document(page_content=txt) for txt in re.split(r"(?=\n##)", response.text)]
+
+def policy_index_directory() -> str:
+    """The Chroma directory to use: the prebuilt bundle's index if one is installed, else db/chroma_db_faq."""
+    bundle_directory = bundle_vector_directory()
+    if bundle_directory and index_is_complete(bundle_directory):
+        return bundle_directory
+    return os.path.join(DB_DIR, "chroma_db_faq")
+
+def prepare_vector_store() -> tuple[VectorStoreRetriever, dict | None]:
+    """Opens the policy index, building (or resuming) it first if needed. Raises on failure.
+
+    Returns the retriever and the build stats, or None if the index was already complete.
+    """
+    persist_directory = policy_index_directory()
+    # We always need an embedding function to query the DB, so we try to initialize it.
+    embeddings = CoalescingEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small"))
+    # Decided before Chroma creates the directory, which would make a new store look like a finished one.
+    complete = index_is_complete(persist_directory)
+    vector_store = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+    stats = None
+    if not complete:
+        # Build (or resume building) the store
+        stats = build_vector_index(load_policy_documents(), vector_store, embeddings, persist_directory)
+    return VectorStoreRetriever(vector_store), stats
+
 @st.cache_resource
 def setup_vector_store():
-    """Sets up the Chroma vector store and handles potential API quota errors gracefully."""
-    with st.spinner("Initializing policy document retriever..."):
-        response = requests.get("https://storage.googleapis.com/benchmarks-artifacts/travel-db/swiss_faq.md")
-        response.raise_for_status()
-        faq_text = response.text
-        docs_as_strings = re.split(r"(?=\n##)", faq_text)
-        docs = [Document(page_content=txt) for txt in docs_as_strings]
-    
-    persist_directory = os.path.join(DB_DIR, "chroma_db_faq")
-    
+    """Sets up the Chroma vector store for the Streamlit app and handles potential API quota errors gracefully."""
     try:
-        # We always need an embedding function to query the DB, so we try to initialize it.
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-        if os.path.exists(persist_directory):
-            # Load existing store
-            vector_store = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
-        else:
-            # Create new store if it doesn't exist
-            st.info("No existing vector store found. Creating a new one...")
-            vector_store = Chroma.from_documents(
-                documents=docs,
-                embedding=embeddings,
-                persist_directory=persist_directory,
+        with st.spinner("Initializing policy document retriever..."):
+            retriever, stats = prepare_vector_store()
+        if stats:
+            st.info(
+                f"Indexed {stats['embedded']} policy documents ({stats['skipped']} already indexed) "
+                f"in {stats['seconds']}s ({stats['docs_per_second']} docs/s)."
             )
-        return VectorStoreRetriever(vector_store)
+        return retriever
 
     except openai.RateLimitError:
         # If we hit a rate limit error, it's a billing/quota issue.
         st.error(
             "OpenAI API Error: You have exceeded your current quota. "
             "Please check your OpenAI plan and billing details to continue using the policy lookup tool. "
-            "The application cannot start without a valid API key.",
+            "The application cannot start without a valid API key. "
+            "Documents indexed so far are saved and will not be embedded again.",
             icon="🚨"
         )
         # We can't proceed, so we stop the app gracefully.